@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OpenAPI 注释脚本性能基准
+功能：按倍数复制 openapi-spec.yml 中的端点生成大规模规范文件，
+测量 translate_openapi_spec 的吞吐量和峰值内存，并与基线比较
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows 上没有 resource 模块，不统计峰值内存
+    resource = None
+
+import translate_openapi
+
+# 默认的复制倍数
+DEFAULT_SCALES = (10, 100, 1000)
+
+# 默认允许的性能下降百分比
+DEFAULT_THRESHOLD = 20.0
+
+
+def _endpoint_range(lines):
+    """
+    找出 paths: 下端点块（/archives 到 /whois）所在的行范围
+
+    返回:
+        (起始行, 结束行)
+    """
+    try:
+        paths = lines.index('paths:')
+    except ValueError:
+        raise ValueError("规范文件中没有 paths: 部分")
+
+    start = None
+    for number in range(paths + 1, len(lines)):
+        line = lines[number]
+        if start is None and line.startswith('  /'):
+            start = number
+        elif line[:1] not in ('', ' ', '#'):
+            # 下一个顶层键
+            return start, number
+    if start is None:
+        raise ValueError("paths: 部分中没有端点")
+    # 文件末尾的空行不属于端点块
+    end = len(lines)
+    while end > start and lines[end - 1] == '':
+        end -= 1
+    return start, end
+
+
+def generate_spec(source_file, output_file, scale):
+    """
+    复制端点块生成放大后的规范文件
+
+    第一份端点保持原样，其余每份的路径加上 /v2、/v3 这样的前缀，保证文件仍是合法的 YAML。
+
+    参数:
+        source_file: 原始规范文件
+        output_file: 输出文件
+        scale: 端点块的复制倍数
+
+    返回:
+        生成文件的行数
+    """
+    with open(source_file, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    start, end = _endpoint_range(lines)
+    block = lines[start:end]
+
+    count = 0
+    with open(output_file, 'w', encoding='utf-8') as out:
+        def write(chunk):
+            out.write('\n'.join(chunk))
+            out.write('\n')
+
+        write(lines[:start])
+        count += start
+        for copy in range(scale):
+            if copy == 0:
+                write(block)
+            else:
+                prefix = f'  /v{copy + 1}/'
+                write([prefix + line[3:] if line.startswith('  /') else line for line in block])
+            count += len(block)
+        # 每块之后已经写入了换行，末尾只剩空行时不再重复写入
+        tail = lines[end:]
+        if tail != ['']:
+            out.write('\n'.join(tail))
+        count += len(tail) - 1
+    return count
+
+
+def _peak_rss_kb():
+    """
+    当前进程的峰值常驻内存（KB），无法统计时返回 None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 上单位是字节，Linux 上是 KB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_one(spec_file, mode, locale):
+    """
+    在当前进程中处理一次，返回耗时和峰值内存
+    由 measure 在独立的子进程中调用，保证每次的峰值内存互不影响
+    """
+    # 预先载入规则，只统计处理文件本身的耗时
+    translate_openapi.get_rules(mode, locale)
+    output_file = spec_file + '.out'
+    started = time.perf_counter()
+    result = translate_openapi.translate_openapi_spec(
+        spec_file, output_file, mode=mode, use_cache=False, verbose=False, locale=locale)
+    seconds = time.perf_counter() - started
+    os.remove(output_file)
+    return {'seconds': seconds, 'lines': result['lines'], 'peak_rss_kb': _peak_rss_kb()}
+
+
+def measure(spec_file, mode, locale, repeat):
+    """
+    在独立子进程中重复处理规范文件，取最快的一次
+
+    返回:
+        {'seconds': 最短耗时, 'lines': 行数, 'peak_rss_kb': 各次中最大的峰值内存}
+    """
+    best = None
+    peak = None
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-one', spec_file,
+             '--mode', mode, '--locale', locale],
+            check=True, stdout=subprocess.PIPE, text=True)
+        result = json.loads(completed.stdout)
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+        if result['peak_rss_kb'] is not None:
+            peak = max(peak or 0, result['peak_rss_kb'])
+    best['peak_rss_kb'] = peak
+    return best
+
+
+def run_benchmarks(source_file, scales, modes, locale, repeat, workdir):
+    """
+    生成各倍数的规范文件并逐个测量
+
+    返回:
+        测量结果列表
+    """
+    results = []
+    for scale in scales:
+        spec_file = os.path.join(workdir, f'openapi-spec-x{scale}.yml')
+        lines = generate_spec(source_file, spec_file, scale)
+        size = os.path.getsize(spec_file)
+        for mode in modes:
+            measured = measure(spec_file, mode, locale, repeat)
+            entry = {
+                'mode': mode,
+                'scale': scale,
+                'lines': lines,
+                'bytes': size,
+                'seconds': measured['seconds'],
+                'lines_per_second': lines / measured['seconds'] if measured['seconds'] else None,
+                'peak_rss_kb': measured['peak_rss_kb'],
+            }
+            results.append(entry)
+            rss = f"{entry['peak_rss_kb'] / 1024:.1f} MB" if entry['peak_rss_kb'] else '未知'
+            print(f"{mode:>4} x{scale:<5} {lines:>10} 行  {entry['seconds']:>8.3f} 秒  "
+                  f"{entry['lines_per_second']:>12.0f} 行/秒  峰值内存 {rss}")
+        os.remove(spec_file)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    与基线比较吞吐量
+
+    参数:
+        results: 本次测量结果
+        baseline: 基线文件中的测量结果
+        threshold: 允许下降的百分比
+
+    返回:
+        超过阈值的退化列表 [(模式, 倍数, 基线行/秒, 本次行/秒), ...]
+    """
+    expected = {(entry['mode'], entry['scale']): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        base = expected.get((entry['mode'], entry['scale']))
+        if not base or not base.get('lines_per_second') or not entry['lines_per_second']:
+            continue
+        if entry['lines_per_second'] < base['lines_per_second'] * (1 - threshold / 100):
+            regressions.append((entry['mode'], entry['scale'],
+                                base['lines_per_second'], entry['lines_per_second']))
+    return regressions
+
+
+def main(argv=None):
+    """
+    命令行入口
+    """
+    parser = argparse.ArgumentParser(description='OpenAPI 注释脚本性能基准')
+    parser.add_argument('--spec', default=translate_openapi.DEFAULT_SPEC,
+                        help='用于生成测试文件的规范文件（默认为本仓库的 openapi-spec.yml）')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES),
+                        help='端点块的复制倍数（默认为 10 100 1000）')
+    parser.add_argument('--mode', choices=('line', 'path'), action='append',
+                        help='要测量的注释模式，可重复指定（默认为 line）')
+    parser.add_argument('--locale', default=translate_openapi.DEFAULT_LOCALE,
+                        help='规则目录的语言')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数，取最快的一次')
+    parser.add_argument('--workdir', help='生成测试文件的目录（默认为临时目录）')
+    parser.add_argument('-o', '--output', help='把结果写入 JSON 文件')
+    parser.add_argument('--baseline', help='基线结果 JSON 文件')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'允许比基线慢的百分比（默认为 {DEFAULT_THRESHOLD:g}）')
+    parser.add_argument('--run-one', metavar='SPEC', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    modes = args.mode or ['line']
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one, modes[0], args.locale)))
+        return 0
+
+    if args.repeat < 1 or any(scale < 1 for scale in args.scales):
+        parser.error('--repeat 和 --scales 必须为正整数')
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        results = run_benchmarks(args.spec, args.scales, modes, args.locale, args.repeat,
+                                 args.workdir)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run_benchmarks(args.spec, args.scales, modes, args.locale, args.repeat,
+                                     workdir)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'spec': os.path.abspath(args.spec),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for mode, scale, expected, actual in regressions:
+            print(f"❌ {mode} x{scale}: {actual:.0f} 行/秒，比基线 {expected:.0f} 行/秒 "
+                  f"慢 {(1 - actual / expected) * 100:.1f}%", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"✅ 所有测量都在基线的 {args.threshold:g}% 以内")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,335 +5,2498 @@ OpenAPI 规范文件中文注释添加脚本
 功能：为 OpenAPI YAML 文件添加详细的中文注释和说明
 """
 
+import argparse
+import bisect
+import collections
+import functools
+import glob
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import pickle
 import re
+import shutil
+import sqlite3
 import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def translate_openapi_spec(input_file, output_file):
+try:
+    import yaml
+except ImportError:  # 行模式不依赖 PyYAML，只有路径模式需要
+    yaml = None
+
+# 规则目录：每种语言一个 JSON 文件，包含文件头、逐行规则和路径规则
+# replacements: 按分组列出的 [匹配模式, 替换内容]，规则按顺序生效，后面的规则作用于前面规则的输出之上
+# path_replacements: 按分组列出的 {JSON Pointer 风格的路径: 注释内容}（路径模式）
+#   路径中的 "/" 写作 "~1"，"~" 写作 "~0"；"*" 匹配该层的任意键或下标
+#   同一节点同时命中精确路径和通配路径时，精确路径优先，每个节点最多一条注释
+# 同目录下的 {语言}.tm.json 是翻译记忆：fields 为 {键名: 注释模板}，translations 为 {原文: 译文}，
+#   没有规则命中的 description / summary 值按原文查找译文并加注释
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translate_openapi_rules')
+
+# 默认语言
+DEFAULT_LOCALE = 'zh-CN'
+
+# 编译后规则缓存的格式版本，RuleSet / PathRuleSet 的结构变化时递增
+RULES_CACHE_VERSION = 4
+
+# 翻译记忆文件的后缀：{语言}.tm.json 中是 description / summary 原文到译文的对照
+MEMORY_SUFFIX = '.tm.json'
+
+# 增量缓存文件的格式版本，格式变化时递增
+CACHE_VERSION = 3
+
+# 默认的增量缓存目录，每个输出文件一个缓存文件
+DEFAULT_CACHE_DIR = os.path.join(RULES_DIR, '__pycache__', 'annotate')
+
+# 增量缓存超过这么久（秒）没有用到时由 prune_cache 清理
+CACHE_MAX_AGE = 30 * 24 * 3600
+
+
+def _digest(text):
+    """
+    计算文本的内容哈希
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# 正则元字符：规则内容中出现未转义的元字符时，说明它不是纯文本行
+_REGEX_METACHARS = set('.^$*+?{}[]|()')
+
+
+def _literal_line(pattern):
+    """
+    判断规则是否为锚定的整行纯文本匹配
+    形如 ^(...)$ 且括号内只含普通字符或转义标点的规则，只能匹配唯一的一行文本
+
+    参数:
+        pattern: 规则的匹配模式
+
+    返回:
+        能匹配的那一行文本；若不是整行纯文本规则则返回 None
+    """
+    if not (pattern.startswith('^(') and pattern.endswith(')$')):
+        return None
+
+    chars = []
+    body = pattern[2:-2]
+    i = 0
+    while i < len(body):
+        ch = body[i]
+        if ch == '\\':
+            # \s、\d 这类转义是字符类，不是纯文本
+            if i + 1 >= len(body) or body[i + 1].isalnum():
+                return None
+            chars.append(body[i + 1])
+            i += 2
+            continue
+        if ch in _REGEX_METACHARS or ch == '\n':
+            return None
+        chars.append(ch)
+        i += 1
+    return ''.join(chars)
+
+
+# 有 libyaml 时使用 C 实现的解析器
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', None) or getattr(yaml, 'SafeLoader', None)
+
+# 值为块标量（| 或 >）的行，其后缩进更深的行都是标量文本而不是键值
+_BLOCK_SCALAR_RE = re.compile(r'(?:[^#]*:|\s*-)\s+[|>][-+0-9]*\s*(?:#.*)?')
+
+
+class RuleSet:
+    """
+    编译后的注释规则集
+    绝大多数规则是整行纯文本匹配，按行文本建立索引后只需一次字典查找；
+    少数真正的正则规则放在回退列表中逐行尝试。
+    结果与按顺序对整个文件逐条执行 re.sub 完全一致。
+    """
+
+    def __init__(self, replacements, header=''):
+        """
+        参数:
+            replacements: (匹配模式, 替换内容) 列表，顺序即生效顺序
+            header: 添加在文件开头的注释
+        """
+        self.header = header
+        # 行文本 -> [(规则序号, 替换后的行), ...]，按规则序号升序
+        self.index = {}
+        # [(规则序号, 匹配模式, 替换内容), ...]，按规则序号升序
+        self.fallback = []
+        # 规则序号 -> 编译后的回退正则，从缓存载入后用到时再编译
+        self._compiled = {}
+        # (行文本, 起始规则序号) -> 展开后的行，只缓存命中规则的行
+        self._memo = {}
+        # 规则生成的注释行，再次运行时据此识别并去掉
+        self.generated = set()
+        # 译文行 -> 原文行，再次运行时据此还原被整行替换的行
+        self.restored = {}
+        # 规则内容的哈希，规则变化时增量缓存随之失效
+        self.fingerprint = _digest(repr((header, [tuple(rule) for rule in replacements])))
+        # 规则序号 -> 匹配模式，用于统计报告
+        self.labels = [pattern for pattern, _ in replacements]
+        # 翻译记忆，由 load_rules 在载入后挂上；没有规则命中的 description / summary 行据此加注释
+        self.memory = None
+
+        for number, (pattern, replacement) in enumerate(replacements):
+            compiled = re.compile(pattern, flags=re.MULTILINE)
+            line = _literal_line(pattern)
+            if line is None:
+                self.fallback.append((number, pattern, replacement))
+                self._compiled[number] = compiled
+                # 替换内容中不引用分组的注释行是固定的
+                self.generated.update(
+                    part for part in replacement.split(r'\n')
+                    if part.startswith('#') and '\\' not in part
+                )
+                continue
+            # 纯文本规则只能匹配这一行，替换结果也是固定的，提前算好
+            expanded = tuple(compiled.sub(replacement, line).split('\n'))
+            self.index.setdefault(line, []).append((number, expanded))
+
+            self.generated.update(new for new in expanded if new != line and new.startswith('#'))
+            kept = [new for new in expanded if not new.startswith('#')]
+            if line not in expanded and len(kept) == 1:
+                self.restored[kept[0]] = line
+
+    def to_data(self):
+        """
+        转换为只含内置类型的数据，供编译缓存序列化
+        缓存中不引用本模块的类，以不同的模块名导入时也能载入
+        """
+        # 纯文本规则的索引可以直接序列化；正则对象载入时需要重新编译，留到用到时再做
+        return {name: value for name, value in self.__dict__.items()
+                if name not in ('_compiled', '_memo', 'memory')}
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        由 to_data 的结果还原规则集
+        """
+        rules = cls.__new__(cls)
+        rules.__dict__.update(data)
+        rules._compiled = {}
+        rules._memo = {}
+        rules.memory = None
+        return rules
+
+    def _first_match(self, line, start, profile=None):
+        """
+        查找序号不小于 start 的第一条命中规则
+
+        参数:
+            line: 不含换行符的一行文本
+            start: 起始规则序号
+            profile: RuleProfile，记录回退正则的耗时
+
+        返回:
+            (规则序号, 替换后的行)；没有命中时返回 None
+        """
+        found = None
+        for number, expanded in self.index.get(line, ()):
+            if number >= start:
+                found = (number, expanded)
+                break
+
+        for number, pattern, replacement in self.fallback:
+            if number < start:
+                continue
+            if found is not None and number > found[0]:
+                break
+            compiled = self._compiled.get(number)
+            if compiled is None:
+                compiled = self._compiled[number] = re.compile(pattern, flags=re.MULTILINE)
+            if profile is None:
+                new_text, count = compiled.subn(replacement, line)
+            else:
+                started = time.perf_counter()
+                new_text, count = compiled.subn(replacement, line)
+                profile.record_attempt(number, time.perf_counter() - started)
+            if count:
+                found = (number, tuple(new_text.split('\n')))
+                break
+
+        return found
+
+    def expand(self, line, start=0):
+        """
+        把一行文本依次交给序号不小于 start 的规则处理
+
+        某条规则命中后，它产生的每一行（包括插入的注释行）
+        继续交给其后的规则处理，这与逐条对全文执行 re.sub 的效果相同。
+
+        参数:
+            line: 不含换行符的一行文本
+            start: 起始规则序号
+
+        返回:
+            处理后的行组成的元组
+        """
+        return self._expand(line, start)[0]
+
+    def _expand(self, line, start, profile=None):
+        """
+        同 expand，另外返回依次命中的规则序号
+
+        返回:
+            (处理后的行组成的元组, 命中的规则序号组成的元组)
+        """
+        key = (line, start)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+
+        found = self._first_match(line, start, profile)
+        if found is None:
+            return (line,), ()
+
+        number, expanded = found
+        result = []
+        applied = [number]
+        for new_line in expanded:
+            new_result, new_applied = self._expand(new_line, number + 1, profile)
+            result.extend(new_result)
+            applied.extend(new_applied)
+        cached = self._memo[key] = (tuple(result), tuple(applied))
+        return cached
+
+    def annotate_lines(self, lines, base=(), profile=None):
+        """
+        单次遍历为若干行添加注释
+
+        参数:
+            lines: 不含换行符的行列表
+            base: 这些行在文档中所处的路径，逐行匹配时不需要
+            profile: RuleProfile，提供时记录每条规则的命中次数和耗时
+
+        返回:
+            添加注释后的行列表
+        """
+        output = []
+        memory = self.memory
+        if profile is None and memory is None:
+            expand = self._expand
+            for line in lines:
+                output.extend(expand(line, 0)[0])
+            return output
+
+        started = time.perf_counter()
+        # 当前所在块标量的键的缩进，不在块标量中时为 None
+        block = None
+        for line in lines:
+            if profile is None:
+                result, applied = self._expand(line, 0)
+            else:
+                line_started = time.perf_counter()
+                result, applied = self._expand(line, 0, profile)
+                profile.record_line(line, applied, time.perf_counter() - line_started)
+
+            if memory is not None:
+                if block is not None and (not line.strip()
+                                          or len(line) - len(line.lstrip(' ')) > block):
+                    # 块标量中的文本
+                    pass
+                else:
+                    block = None
+                    if not applied:
+                        # 没有规则命中的 description / summary 行查一次翻译记忆
+                        comment = memory.comment_for(line, profile)
+                        if comment is not None:
+                            output.append(comment)
+                    if ('|' in line or '>' in line) and _BLOCK_SCALAR_RE.fullmatch(line):
+                        block = len(line) - len(line.lstrip(' '))
+            output.extend(result)
+        if profile is not None:
+            profile.elapsed += time.perf_counter() - started
+        return output
+
+    def annotate(self, content):
+        """
+        单次遍历为整段文本添加注释
+
+        参数:
+            content: 文件内容
+
+        返回:
+            添加注释后的内容
+        """
+        return '\n'.join(self.annotate_lines(content.split('\n')))
+
+
+def _pointer_tokens(pointer):
+    """
+    把 JSON Pointer 拆分为各层的键，并还原 ~1 和 ~0 转义
+    """
+    if not pointer:
+        return []
+    if not pointer.startswith('/'):
+        raise ValueError(f"路径必须以 / 开头: {pointer!r}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+class _PathNode:
+    """
+    路径规则前缀树的节点
+    """
+
+    __slots__ = ('children', 'wildcard', 'comment', 'rule')
+
+    def __init__(self):
+        self.children = {}
+        self.wildcard = None
+        self.comment = None
+        self.rule = None
+
+    def to_data(self):
+        """
+        转换为嵌套的元组：(子节点, 通配子节点, 注释, 规则序号)
+        """
+        return ({token: child.to_data() for token, child in self.children.items()},
+                None if self.wildcard is None else self.wildcard.to_data(),
+                self.comment, self.rule)
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        由 to_data 的结果还原节点
+        """
+        children, wildcard, comment, rule = data
+        node = cls()
+        node.children = {token: cls.from_data(child) for token, child in children.items()}
+        node.wildcard = None if wildcard is None else cls.from_data(wildcard)
+        node.comment = comment
+        node.rule = rule
+        return node
+
+
+class PathRuleSet:
+    """
+    按 YAML 路径生效的注释规则集
+    规则编译为前缀树，在一次 YAML 事件流遍历中为每个节点维护可达的树节点，
+    每个节点的查找代价与文件大小和规则数量无关，且最多得到一条注释。
+    """
+
+    def __init__(self, path_rules, header=''):
+        """
+        参数:
+            path_rules: {路径: 注释内容} 字典，路径中的 * 匹配任意键或下标
+            header: 添加在文件开头的注释
+        """
+        self.header = header
+        self.root = _PathNode()
+        self.generated = set()
+        self.restored = {}
+        self.fingerprint = _digest(repr((header, sorted(path_rules.items()))))
+        # 规则序号 -> 路径，用于统计报告
+        self.labels = list(path_rules)
+        # 翻译记忆，由 load_rules 在载入后挂上
+        self.memory = None
+        for number, (pointer, comment) in enumerate(path_rules.items()):
+            self.generated.update('# ' + text for text in comment.split('\n'))
+            node = self.root
+            for token in _pointer_tokens(pointer):
+                if token == '*':
+                    if node.wildcard is None:
+                        node.wildcard = _PathNode()
+                    node = node.wildcard
+                else:
+                    node = node.children.setdefault(token, _PathNode())
+            node.comment = comment
+            node.rule = number
+
+    def to_data(self):
+        """
+        转换为只含内置类型的数据，供编译缓存序列化
+        """
+        data = {name: value for name, value in self.__dict__.items() if name != 'memory'}
+        data['root'] = self.root.to_data()
+        return data
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        由 to_data 的结果还原规则集
+        """
+        rules = cls.__new__(cls)
+        rules.__dict__.update(data)
+        rules.root = _PathNode.from_data(data['root'])
+        rules.memory = None
+        return rules
+
+    @staticmethod
+    def _advance(states, token):
+        """
+        从当前可达的树节点沿一个键前进一层，精确匹配排在通配之前
+        """
+        following = []
+        for state in states:
+            child = state.children.get(token)
+            if child is not None:
+                following.append(child)
+            if state.wildcard is not None:
+                following.append(state.wildcard)
+        return following
+
+    def comments_by_line(self, content, base=(), profile=None):
+        """
+        遍历 YAML 事件流，找出每个命中规则的节点所在的行
+
+        参数:
+            content: YAML 文本
+            base: 文本的根节点在完整文档中的路径，如 ('paths',)
+            profile: RuleProfile，提供时记录每条规则的命中次数
+
+        返回:
+            {行号（从 0 开始）: [注释内容, ...]} 字典
+        """
+        if yaml is None:
+            raise RuntimeError("路径模式需要 PyYAML，请先安装: pip install pyyaml")
+
+        comments = {}
+        memory = self.memory
+        base_states = [self.root]
+        for token in base:
+            base_states = self._advance(base_states, token)
+
+        def mark(states, line):
+            for state in states:
+                if state.comment is not None:
+                    comments.setdefault(line, []).append(state.comment)
+                    if profile is not None:
+                        profile.hits[state.rule] += 1
+                    break
+
+        # 栈中每一项: [是否为映射, 当前节点的可达状态, 映射是否在等待键 / 序列下标, 值的可达状态,
+        #              等待查翻译记忆的 (键, 键所在的行)]
+        stack = []
+        for event in yaml.parse(content, Loader=_YAML_LOADER):
+            if isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                stack.pop()
+                continue
+            if not isinstance(event, yaml.NodeEvent):
+                continue
+
+            line = event.start_mark.line
+            if not stack:
+                # 文档根节点
+                states = base_states
+            elif stack[-1][0]:
+                frame = stack[-1]
+                if frame[2]:
+                    # 映射的键：注释加在键所在的行
+                    frame[2] = False
+                    if isinstance(event, yaml.ScalarEvent):
+                        frame[3] = self._advance(frame[1], event.value)
+                        if memory is not None and event.value in memory.fields:
+                            # description / summary 先查翻译记忆，查不到时再用路径规则
+                            frame[4] = (event.value, line)
+                        else:
+                            mark(frame[3], line)
+                    else:
+                        frame[3] = []
+                    states = []
+                else:
+                    # 映射的值：注释已经加在键上
+                    frame[2] = True
+                    states = frame[3]
+                    if frame[4] is not None:
+                        field, key_line = frame[4]
+                        frame[4] = None
+                        comment = None
+                        # 只查与键同一行的单行标量，与逐行模式保持一致
+                        if (isinstance(event, yaml.ScalarEvent) and event.style not in ('|', '>')
+                                and event.end_mark.line == key_line):
+                            comment = memory.comment(field, event.value, profile)
+                        if comment is None:
+                            mark(states, key_line)
+                        else:
+                            comments.setdefault(key_line, []).append(comment)
+            else:
+                # 序列的元素：按下标匹配
+                frame = stack[-1]
+                states = self._advance(frame[1], str(frame[2]))
+                frame[2] += 1
+                mark(states, line)
+
+            if isinstance(event, yaml.MappingStartEvent):
+                stack.append([True, states, True, [], None])
+            elif isinstance(event, yaml.SequenceStartEvent):
+                stack.append([False, states, 0, None])
+
+        return comments
+
+    def annotate_lines(self, lines, base=(), profile=None):
+        """
+        按 YAML 结构为若干行添加注释
+
+        参数:
+            lines: 不含换行符的行列表，需能单独解析为 YAML
+            base: 这些行的根节点在完整文档中的路径
+            profile: RuleProfile，提供时记录每条规则的命中次数（路径模式不区分单条规则的耗时）
+
+        返回:
+            添加注释后的行列表
+        """
+        started = time.perf_counter()
+        content = '\n'.join(lines)
+        comments = self.comments_by_line(content, base, profile)
+        output = []
+        for number, line in enumerate(lines):
+            for comment in comments.get(number, ()):
+                output.extend('# ' + text for text in comment.split('\n'))
+            output.append(line)
+        if profile is not None:
+            profile.lines += len(lines)
+            profile.bytes += len(content.encode('utf-8')) + 1
+            profile.elapsed += time.perf_counter() - started
+        return output
+
+    def annotate(self, content):
+        """
+        按 YAML 结构为整段文本添加注释
+
+        参数:
+            content: 文件内容
+
+        返回:
+            添加注释后的内容
+        """
+        return '\n'.join(self.annotate_lines(content.split('\n')))
+
+
+class RuleProfile:
+    """
+    逐条规则的命中次数与耗时统计
+    用于找出从未命中的规则、命中过于频繁的规则，以及耗时最多的规则。
+
+    逐行模式下，一行命中多条规则时该行的耗时平均分摊给这些规则，
+    回退正则每次尝试匹配的耗时单独计入该规则；路径模式只统计命中次数。
+    """
+
+    def __init__(self):
+        # 规则序号 -> 命中次数
+        self.hits = collections.Counter()
+        # 规则序号 -> 累计耗时（秒）
+        self.seconds = collections.defaultdict(float)
+        # 扫描的行数和字节数
+        self.lines = 0
+        self.bytes = 0
+        # 添加注释的总耗时（秒）
+        self.elapsed = 0.0
+        # 翻译记忆的查询次数和命中次数
+        self.memory_lookups = 0
+        self.memory_hits = 0
+        # 当前行中回退正则已经计入的耗时
+        self._attempts = 0.0
+
+    def record_attempt(self, number, seconds):
+        """
+        记录一次回退正则的匹配尝试
+        """
+        self.seconds[number] += seconds
+        self._attempts += seconds
+
+    def record_line(self, line, applied, seconds):
+        """
+        记录一行的处理结果
+
+        参数:
+            line: 处理的行
+            applied: 依次命中的规则序号
+            seconds: 处理这一行的耗时
+        """
+        self.lines += 1
+        self.bytes += len(line.encode('utf-8')) + 1
+        if applied:
+            share = max(seconds - self._attempts, 0.0) / len(applied)
+            for number in applied:
+                self.hits[number] += 1
+                self.seconds[number] += share
+        self._attempts = 0.0
+
+    def merge(self, other):
+        """
+        合并另一份统计（如其他工作进程的结果）
+        """
+        self.hits.update(other.hits)
+        for number, seconds in other.seconds.items():
+            self.seconds[number] += seconds
+        self.lines += other.lines
+        self.bytes += other.bytes
+        self.elapsed += other.elapsed
+        self.memory_lookups += other.memory_lookups
+        self.memory_hits += other.memory_hits
+        return self
+
+    def to_dict(self, rules, sort='hits'):
+        """
+        转换为可写入 JSON 的字典
+
+        参数:
+            rules: 产生这份统计的规则集
+            sort: 'hits' 按命中次数排序，'time' 按耗时排序
+        """
+        entries = [
+            {
+                'rule': number,
+                'pattern': label,
+                'hits': self.hits.get(number, 0),
+                'seconds': self.seconds.get(number, 0.0),
+            }
+            for number, label in enumerate(rules.labels)
+        ]
+        field = 'seconds' if sort == 'time' else 'hits'
+        entries.sort(key=lambda entry: (-entry[field], entry['rule']))
+        return {
+            'lines': self.lines,
+            'bytes': self.bytes,
+            'seconds': self.elapsed,
+            'memory': {'lookups': self.memory_lookups, 'hits': self.memory_hits},
+            'rules': [entry for entry in entries if entry['hits']],
+            'dead': [entry['rule'] for entry in sorted(entries, key=lambda entry: entry['rule'])
+                     if not entry['hits']],
+        }
+
+    def report(self, rules, sort='hits', limit=None):
+        """
+        生成按命中次数或耗时排序的文本报告
+
+        参数:
+            rules: 产生这份统计的规则集
+            sort: 'hits' 按命中次数排序，'time' 按耗时排序
+            limit: 只列出前若干条命中的规则
+        """
+        data = self.to_dict(rules, sort)
+        lines = [
+            f"规则统计: 扫描 {data['lines']} 行，{data['bytes']} 字节，"
+            f"用时 {data['seconds'] * 1000:.1f} ms",
+            f"{'排名':>4}  {'命中':>8}  {'耗时(ms)':>10}  规则",
+        ]
+        for rank, entry in enumerate(data['rules'][:limit], 1):
+            lines.append(f"{rank:>6}  {entry['hits']:>10}  {entry['seconds'] * 1000:>12.3f}  "
+                         f"#{entry['rule']} {entry['pattern']}")
+        lines.append(f"翻译记忆: 查询 {self.memory_lookups} 次，命中 {self.memory_hits} 次")
+        lines.append(f"从未命中的规则: {len(data['dead'])} 条")
+        for number in data['dead']:
+            lines.append(f"  #{number} {rules.labels[number]}")
+        return '\n'.join(lines)
+
+
+def normalize_text(text):
+    """
+    翻译记忆的键：合并连续空白、去掉末尾的句点并忽略大小写
+    同一句描述在不同端点中写法略有出入时也能对上
+    """
+    return ' '.join(text.split()).rstrip('.').casefold()
+
+
+# 键值行：翻译记忆只关心键为 description / summary 的单行值
+_MEMORY_LINE_RE = re.compile(r' *(?:- )?(\w+): +(\S.*)')
+
+
+class TranslationMemory:
+    """
+    翻译记忆：规范化后的原文 -> 译文
+    对照表保存在 SQLite 文件中，前面有一层 LRU 缓存，
+    同一个字符串在进程内只查询一次存储，之后每行只需一次字典查找。
+    可以在多个线程间共享；fork 出的子进程会重新打开存储。
+    """
+
+    def __init__(self, store_file, fields, fingerprint, cache_size=4096, entries=None):
+        """
+        参数:
+            store_file: SQLite 存储文件
+            fields: {键名: 注释模板}，如 {'summary': '摘要：{}'}
+            fingerprint: 翻译记忆内容的哈希，内容变化时增量缓存随之失效
+            cache_size: LRU 缓存的条目数
+            entries: 已在内存中的 {规范化的原文: 译文}，提供时不使用存储文件
+        """
+        self.store_file = store_file
+        self.fields = fields
+        self.fingerprint = fingerprint
+        # 生成的注释行以模板中 {} 之前的部分开头，如 "# 摘要："
+        self._prefixes = tuple('# ' + prefix for prefix in
+                               (template.split('{}', 1)[0] for template in fields.values())
+                               if prefix)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        # preload 后全部译文都在内存中，不再访问存储
+        self._entries = entries
+        # 全部译文的集合，识别值修改后留下的旧注释时用到，第一次用到时载入
+        self._targets = None
+        self.translate = functools.lru_cache(maxsize=cache_size)(self._query)
+
+    def preload(self):
+        """
+        把全部译文读入内存，之后的查询不再访问存储文件
+        """
+        with self._lock:
+            if self._entries is None:
+                connection = _open_store(self.store_file)
+                try:
+                    self._entries = dict(connection.execute('SELECT source, target FROM memory'))
+                finally:
+                    connection.close()
+
+    def _query(self, text):
+        """
+        在存储中查找原文对应的译文，找不到时返回 None
+        """
+        key = normalize_text(text)
+        if self._entries is not None:
+            return self._entries.get(key)
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT target FROM memory WHERE source = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _connect(self):
+        """
+        当前进程的存储连接，调用方需持有锁
+        """
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = _open_store(self.store_file)
+            self._pid = os.getpid()
+        return self._connection
+
+    def _translations(self):
+        """
+        翻译记忆中全部译文的集合
+        """
+        if self._targets is None:
+            if self._entries is not None:
+                targets = set(self._entries.values())
+            else:
+                with self._lock:
+                    targets = {row[0] for row in self._connect().execute(
+                        'SELECT target FROM memory')}
+            self._targets = targets
+        return self._targets
+
+    def comment(self, field, value, profile=None):
+        """
+        按键名的模板生成值的译文注释（不含 "# "）
+
+        参数:
+            field: 键名，如 'description'
+            value: 解析后的标量值
+            profile: RuleProfile，提供时记录查询和命中次数
+
+        返回:
+            注释内容；键名不在模板中或没有译文时返回 None
+        """
+        template = self.fields.get(field)
+        if template is None:
+            return None
+        translation = self.translate(value)
+        if profile is not None:
+            profile.memory_lookups += 1
+            profile.memory_hits += translation is not None
+        return None if translation is None else template.format(translation)
+
+    def comment_for(self, line, profile=None):
+        """
+        为一行 description / summary 键值生成译文注释行
+
+        参数:
+            line: 不含换行符的一行文本
+            profile: RuleProfile，提供时记录查询和命中次数
+
+        返回:
+            "# " 开头的注释行；不是要查的键或没有译文时返回 None
+        """
+        match = _MEMORY_LINE_RE.fullmatch(line)
+        if match is None or match.group(1) not in self.fields:
+            return None
+        value = match.group(2)
+        if value[0] == "'" and value.endswith("'") and len(value) > 1:
+            value = value[1:-1].replace("''", "'")
+        elif value[0] == '"' and value.endswith('"') and len(value) > 1:
+            try:
+                value = json.loads(value)
+            except ValueError:
+                value = value[1:-1]
+        elif value[0] in '|>':
+            # 块标量的文本在后面的行中
+            return None
+        else:
+            value = value.split(' #', 1)[0]
+        comment = self.comment(match.group(1), value, profile)
+        return None if comment is None else '# ' + comment
+
+    def is_comment(self, line):
+        """
+        判断一行是否以某个模板的前缀开头，即可能是翻译记忆生成的注释行
+        """
+        return bool(self._prefixes) and line.startswith(self._prefixes)
+
+    def is_generated(self, comment, line):
+        """
+        判断注释行是否为翻译记忆为下一行生成的
+
+        下一行须是 description / summary 键，且注释与该行现在的译文注释相同，
+        或者是某条译文套上模板的结果（值修改后留下的旧注释）；
+        维护者手写的、前缀相同的注释不会被当作生成的注释。
+
+        参数:
+            comment: 注释行
+            line: 注释下面的一行
+        """
+        match = _MEMORY_LINE_RE.fullmatch(line)
+        if match is None or match.group(1) not in self.fields:
+            return False
+        if self.comment_for(line) == comment:
+            return True
+        body = comment[2:]
+        for template in self.fields.values():
+            prefix, _, suffix = template.partition('{}')
+            if (len(body) > len(prefix) + len(suffix) and body.startswith(prefix)
+                    and body.endswith(suffix)
+                    and body[len(prefix):len(body) - len(suffix)] in self._translations()):
+                return True
+        return False
+
+
+def _open_store(store_file):
+    """
+    以只读方式打开翻译记忆存储
+    """
+    uri = 'file:' + urllib.parse.quote(os.path.abspath(store_file)) + '?mode=ro'
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+
+def _build_store(store_file, memory, fingerprint):
+    """
+    把翻译记忆文件写入 SQLite 存储，先写临时文件再替换，其他进程不会读到写了一半的存储
+    """
+    directory = os.path.dirname(store_file)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_file = tempfile.mkstemp(prefix='.' + os.path.basename(store_file) + '.',
+                                     suffix='.tmp', dir=directory)
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(temp_file)
+        try:
+            with connection:
+                connection.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+                connection.execute(
+                    'CREATE TABLE memory (source TEXT PRIMARY KEY, target TEXT) WITHOUT ROWID')
+                connection.executemany(
+                    'INSERT OR REPLACE INTO memory VALUES (?, ?)',
+                    ((normalize_text(source), target)
+                     for source, target in memory.get('translations', {}).items()))
+                connection.executemany('INSERT INTO meta VALUES (?, ?)', [
+                    ('fingerprint', fingerprint),
+                    ('fields', json.dumps(memory.get('fields', {}), ensure_ascii=False)),
+                ])
+        finally:
+            connection.close()
+        os.replace(temp_file, store_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def load_memory(locale=DEFAULT_LOCALE, cache_dir=None):
+    """
+    载入语言对应的翻译记忆
+
+    翻译记忆文件 {语言}.tm.json 的哈希不变时直接使用已有的 SQLite 存储，
+    否则重新生成；存储无法写入（如目录只读）时翻译记忆只保存在内存中。
+
+    参数:
+        locale: 语言
+        cache_dir: 存储所在目录，默认为规则目录下的 __pycache__
+
+    返回:
+        TranslationMemory；该语言没有翻译记忆文件时返回 None
+    """
+    path = catalogue_file(locale)[:-len('.json')] + MEMORY_SUFFIX
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    fingerprint = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    cache_dir = cache_dir or os.path.join(RULES_DIR, '__pycache__')
+    store_file = os.path.join(cache_dir, f'{locale}.tm.sqlite3')
+    try:
+        connection = _open_store(store_file)
+        try:
+            meta = dict(connection.execute('SELECT key, value FROM meta'))
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        meta = {}
+    if meta.get('fingerprint') == fingerprint:
+        return TranslationMemory(store_file, json.loads(meta['fields']), fingerprint)
+
+    memory = json.loads(data.decode('utf-8'))
+    fields = memory.get('fields', {})
+    try:
+        _build_store(store_file, memory, fingerprint)
+    except (OSError, sqlite3.Error):
+        # 不使用共享的临时目录：其中的存储可能被其他用户替换
+        entries = {normalize_text(source): target
+                   for source, target in memory.get('translations', {}).items()}
+        return TranslationMemory(None, fields, fingerprint, entries=entries)
+    return TranslationMemory(store_file, fields, fingerprint)
+
+
+def catalogue_file(locale=DEFAULT_LOCALE):
+    """
+    语言对应的规则目录文件路径
+    """
+    if not re.fullmatch(r'[A-Za-z]{2,3}(?:[-_][A-Za-z0-9]+)*', locale):
+        raise ValueError(f"无效的语言名称: {locale!r}")
+    return os.path.join(RULES_DIR, f'{locale}.json')
+
+
+def available_locales():
+    """
+    列出规则目录中已有的语言
+    """
+    return sorted(name[:-len('.json')] for name in os.listdir(RULES_DIR)
+                  if name.endswith('.json') and not name.endswith(MEMORY_SUFFIX))
+
+
+def compile_catalogue(catalogue, mode='line'):
+    """
+    把规则目录编译为规则集
+
+    参数:
+        catalogue: 解析后的规则目录
+        mode: 'line' 为逐行匹配模式，'path' 为按 YAML 路径匹配模式
+    """
+    header = catalogue.get('header', '')
+    if mode == 'line':
+        replacements = [
+            tuple(rule) for group in catalogue.get('replacements', ()) for rule in group['rules']
+        ]
+        return RuleSet(replacements, header)
+    if mode == 'path':
+        path_rules = {}
+        for group in catalogue.get('path_replacements', ()):
+            path_rules.update(group['rules'])
+        return PathRuleSet(path_rules, header)
+    raise ValueError(f"未知的注释模式: {mode!r}")
+
+
+def load_rules(mode='line', locale=DEFAULT_LOCALE, cache_dir=None):
+    """
+    载入编译后的规则集
+
+    编译结果以 pickle 形式缓存在规则目录的 __pycache__ 中，
+    规则目录文件的哈希不变时直接载入，不再解析 JSON 和编译正则。
+
+    参数:
+        mode: 'line' 为逐行匹配模式，'path' 为按 YAML 路径匹配模式
+        locale: 语言
+        cache_dir: 编译缓存目录，默认为规则目录下的 __pycache__
+
+    该语言有翻译记忆时一并载入，翻译记忆的哈希计入规则集的哈希。
+    """
+    if mode not in ('line', 'path'):
+        raise ValueError(f"未知的注释模式: {mode!r}")
+
+    path = catalogue_file(locale)
+    with open(path, 'rb') as f:
+        data = f.read()
+    stamp = (RULES_CACHE_VERSION, mode, hashlib.blake2b(data, digest_size=16).hexdigest())
+
+    cache_dir = cache_dir or os.path.join(RULES_DIR, '__pycache__')
+    cache_file = os.path.join(cache_dir, f'{locale}.{mode}.pickle')
+    rules = None
+    try:
+        with open(cache_file, 'rb') as f:
+            if pickle.load(f) == stamp:
+                data = pickle.load(f)
+                rules = (RuleSet if mode == 'line' else PathRuleSet).from_data(data)
+    except (OSError, pickle.PickleError, EOFError, AttributeError, ValueError, ImportError,
+            KeyError, TypeError):
+        pass
+
+    if rules is None:
+        rules = compile_catalogue(json.loads(data.decode('utf-8')), mode)
+
+        # 缓存写入失败（如目录只读）不影响使用
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, temp_file = tempfile.mkstemp(prefix=f'.{locale}.{mode}.', suffix='.tmp',
+                                             dir=cache_dir)
+            with open(fd, 'wb') as f:
+                pickle.dump(stamp, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(rules.to_data(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, cache_file)
+        except OSError:
+            pass
+
+    rules.memory = load_memory(locale, cache_dir)
+    if rules.memory is not None:
+        rules.fingerprint = _digest(rules.fingerprint + rules.memory.fingerprint)
+    return rules
+
+
+# (模式, 语言) -> 规则集，同一进程内只载入一次
+_loaded_rules = {}
+
+
+def get_rules(mode='line', locale=DEFAULT_LOCALE):
+    """
+    按模式和语言获取对应的规则集，首次调用时载入，之后复用
+
+    参数:
+        mode: 'line' 为逐行匹配模式，'path' 为按 YAML 路径匹配模式
+        locale: 语言
+    """
+    key = (mode, locale)
+    rules = _loaded_rules.get(key)
+    if rules is None:
+        rules = _loaded_rules[key] = load_rules(mode, locale)
+    return rules
+
+
+# 划分片段时向下细分的层数：paths 下的每个端点、components 下的每个组件各为一个片段
+_SECTION_DEPTHS = {'paths': 1, 'components': 2}
+
+# 块映射中的一行键值：键可以是单引号、双引号或普通标量，值为空时表示下面是嵌套内容
+_KEY_LINE_RE = re.compile(
+    r"""(?:'((?:[^']|'')*)'|"((?:[^"\\]|\\.)*)"|([^\s#'"?:\-][^#]*?))\s*:(?:\s+(.*))?"""
+)
+
+
+def _read_lines(path):
+    """
+    逐行惰性读取文本文件
+    产出不含换行符的行，结果与对整个文件执行 str.split('\n') 相同
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        line = ''
+        for line in f:
+            yield line[:-1] if line.endswith('\n') else line
+        if line == '' or line.endswith('\n'):
+            yield ''
+
+
+def _file_digest(path):
+    """
+    分块计算文件内容的哈希，文件不存在时返回 None
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def _strip_lines(raw_lines, rules, header=True):
+    """
+    去掉之前生成的文件头和注释，还原被整行替换的译文，并在最前面补上文件头
+
+    参数:
+        raw_lines: 输入文件的行（可迭代对象）
+        rules: 规则集
+        header: 这些行是否从文件开头开始；为 False 时不处理文件头
+
+    返回:
+        逐行产出 (待处理的行, 输入中的行) 的生成器；
+        被去掉的注释行没有待处理的行，补上的文件头没有输入中的行，对应位置为 None
+
+    翻译记忆生成的注释要等看到下一行后才能判断是否去掉：下一行是 description / summary 键，
+    且注释是当前的译文注释或某条译文套上模板的结果时去掉，值修改后旧的注释不会残留，
+    手写的注释则保留。
+    """
+    raw_lines = iter(raw_lines)
+    if header:
+        header = rules.header.split('\n')[:-1]
+        head = list(itertools.islice(raw_lines, len(header)))
+        if head == header:
+            for line in head:
+                yield line, line
+        else:
+            for line in header:
+                yield line, None
+            raw_lines = itertools.chain(head, raw_lines)
+
+    generated = rules.generated
+    restored = rules.restored
+    memory = rules.memory
+    # 等待下一行才能判断的注释行，连同夹在其间的生成的注释行
+    held = []
+    for line in raw_lines:
+        if line in generated:
+            if held:
+                held.append(line)
+            else:
+                yield None, line
+            continue
+        if memory is not None and memory.is_comment(line):
+            held.append(line)
+            continue
+        if held:
+            for comment in held:
+                drop = comment in generated or memory.is_generated(comment, line)
+                yield (None if drop else comment), comment
+            held = []
+        yield restored.get(line, line), line
+    for comment in held:
+        yield (None if comment in generated else comment), comment
+
+
+def strip_annotations(content, rules=None):
+    """
+    去掉之前生成的文件头和注释，得到原始规范内容
+
+    参数:
+        content: 添加过注释的文件内容
+        rules: 规则集，默认为默认语言的逐行匹配规则集
+    """
+    rules = rules or get_rules()
+    return '\n'.join(_original_lines(content.split('\n'), rules))
+
+
+def _original_lines(raw_lines, rules):
+    """
+    逐行产出去掉文件头和生成的注释、还原译文之后的原始行
+
+    参数:
+        raw_lines: 输入文件的行（可迭代对象）
+        rules: 规则集
+    """
+    # _strip_lines 产出的行总是以文件头开始（原有的或补上的）
+    skip = rules.header.count('\n')
+    for line, _ in _strip_lines(raw_lines, rules):
+        if line is None:
+            continue
+        if skip:
+            skip -= 1
+            continue
+        yield line
+
+
+def _section_base(line, opened):
+    """
+    判断一行是否开始一个新片段，同时维护各层已打开的映射键
+
+    参数:
+        line: 一行文本
+        opened: 各层（每层缩进两个空格）最近一个键；该键的值不是嵌套映射时为 None
+
+    返回:
+        新片段的根节点路径；不是片段边界时返回 None
+    """
+    stripped = line.lstrip(' ')
+    if not stripped or stripped[0] in '#\t' or line == '...':
+        return None
+
+    # 这一行结束了缩进不小于它的各层
+    indent = len(line) - len(stripped)
+    level = (indent + 1) // 2
+    del opened[level:]
+
+    match = _KEY_LINE_RE.fullmatch(stripped)
+    if indent % 2 or match is None or level != len(opened):
+        return None
+
+    single, double, plain, rest = match.groups()
+    if single is not None:
+        key = single.replace("''", "'")
+    else:
+        key = double if double is not None else plain
+    nested = not rest or rest.startswith('#')
+
+    boundary = level == 0 or (all(opened) and level <= _SECTION_DEPTHS.get(opened[0], 0))
+    base = tuple(opened)
+    opened.append(key if nested else None)
+    return base if boundary else None
+
+
+def _iter_sections(items, opened=None):
+    """
+    按顶层键、paths 下的每个端点和 components 下的每个组件把行流划分为片段
+
+    参数:
+        items: _strip_lines 产出的 (待处理的行, 输入中的行)
+        opened: 从文件中间的片段边界开始划分时，传入该片段根节点路径组成的列表；
+                遍历结束后其中是末尾各层已打开的映射键
+
+    返回:
+        逐个产出 (片段根节点的路径, 待处理的行, 输入中对应的行, 输入中的行是否完整) 的生成器
+    """
+    opened = [] if opened is None else opened
+    base = tuple(opened)
+    lines = []
+    raw = []
+    pending = []
+    complete = True
+    for line, raw_line in items:
+        if line is None:
+            # 生成的注释属于它后面的那一行
+            pending.append(raw_line)
+            continue
+
+        new_base = _section_base(line, opened)
+        if new_base is not None:
+            if lines:
+                yield base, lines, raw, complete
+                lines, raw, complete = [], [], True
+            base = new_base
+
+        lines.append(line)
+        raw.extend(pending)
+        pending = []
+        if raw_line is None:
+            complete = False
+        else:
+            raw.append(raw_line)
+
+    raw.extend(pending)
+    yield base, lines, raw, complete
+
+
+class _PreviousOutput:
+    """
+    按上次记录的片段顺序惰性读取上次的输出，供未变化的片段直接复用
+    """
+
+    def __init__(self, output_file, sections):
+        """
+        参数:
+            output_file: 上次的输出文件，内容需与缓存中记录的哈希一致
+            sections: 缓存中记录的片段列表 [[片段哈希, 行数, 注释结果哈希], ...]
+        """
+        self._lines = _read_lines(output_file)
+        self._sections = sections
+        self._next = 0
+        self._ordinals = {}
+        for ordinal, (key, _, _) in enumerate(sections):
+            self._ordinals.setdefault(key, []).append(ordinal)
+
+    def take(self, key):
+        """
+        取出与片段哈希对应的上次输出；片段已被跳过或不存在时返回 None
+        """
+        for ordinal in self._ordinals.get(key, ()):
+            if ordinal >= self._next:
+                break
+        else:
+            return None
+
+        while self._next < ordinal:
+            for _ in range(self._sections[self._next][1]):
+                next(self._lines)
+            self._next += 1
+        self._next += 1
+        return [next(self._lines) for _ in range(self._sections[ordinal][1])]
+
+    def close(self):
+        self._lines.close()
+
+
+def _replace_file(temp_file, output_file):
+    """
+    用临时文件替换输出文件，保留原文件的权限
+    """
+    if os.path.exists(output_file):
+        shutil.copymode(output_file, temp_file)
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_file, 0o666 & ~umask)
+    os.replace(temp_file, output_file)
+
+    # 把目录项的变化也落盘，断电后不会丢失这次替换（不支持的平台上忽略）
+    if hasattr(os, 'O_DIRECTORY'):
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(output_file)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+class _ChangedFileWriter:
+    """
+    内容变化时才原子替换的输出文件
+
+    写入的内容先与已有文件（通过 mmap）逐块比较，相同的部分不落盘；
+    第一次出现差异时才在同目录下创建临时文件，复制相同的前缀后继续写入，
+    提交时 fsync 并用 os.replace 替换原文件。
+    内容完全相同时不产生任何写入，文件的修改时间保持不变；
+    中途出错或进程崩溃时原文件保持完整。
+    输出文件是符号链接时替换链接指向的文件，链接本身保持不变。
+    """
+
+    def __init__(self, output_file, digest=True):
+        """
+        参数:
+            output_file: 输出文件路径，可以与正在读取的输入文件相同
+            digest: 是否计算写入内容的哈希
+        """
+        # 符号链接解析为实际文件，临时文件也创建在实际文件所在的目录
+        self.output_file = os.path.realpath(output_file)
+        self._hash = hashlib.blake2b(digest_size=16) if digest else None
+        # 已确认与原文件相同的字节数
+        self._offset = 0
+        self._temp = None
+        self._temp_file = None
+        self._existing = None
+        self._mapped = None
+        try:
+            self._existing = open(output_file, 'rb')
+        except FileNotFoundError:
+            return
+        # 空文件不能映射，按长度为 0 处理
+        if os.fstat(self._existing.fileno()).st_size:
+            self._mapped = mmap.mmap(self._existing.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def write(self, text):
+        """
+        写入一段文本或字节串
+        """
+        data = text.encode('utf-8') if isinstance(text, str) else text
+        if self._hash is not None:
+            self._hash.update(data)
+        if self._temp is None:
+            end = self._offset + len(data)
+            if self._mapped is not None and self._mapped[self._offset:end] == data:
+                self._offset = end
+                return
+            self._diverge()
+        self._temp.write(data)
+
+    def _diverge(self):
+        """
+        内容出现差异：创建临时文件并写入已确认相同的前缀
+        """
+        directory, name = os.path.split(self.output_file)
+        fd, self._temp_file = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+        self._temp = open(fd, 'wb')
+        if self._offset:
+            self._temp.write(self._mapped[:self._offset])
+
+    def hexdigest(self):
+        """
+        已写入内容的哈希，与 _file_digest 对同样内容的计算结果相同
+        """
+        return self._hash.hexdigest()
+
+    def _close_existing(self):
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+        if self._existing is not None:
+            self._existing.close()
+            self._existing = None
+
+    def commit(self):
+        """
+        完成写入：内容有变化时替换输出文件
+
+        返回:
+            是否写入了输出文件
+        """
+        size = len(self._mapped) if self._mapped is not None else 0
+        unchanged = self._temp is None and self._existing is not None and self._offset == size
+        try:
+            if unchanged:
+                return False
+            if self._temp is None:
+                # 新内容是原文件的前缀，或原文件不存在
+                self._diverge()
+            self._temp.flush()
+            os.fsync(self._temp.fileno())
+            self._temp.close()
+            # 替换之前先释放原文件（Windows 上打开的文件不能被替换）
+            self._close_existing()
+            _replace_file(self._temp_file, self.output_file)
+            self._temp_file = None
+            return True
+        finally:
+            self.abort()
+
+    def abort(self):
+        """
+        放弃写入，删除临时文件，原文件保持不变
+        """
+        self._close_existing()
+        if self._temp is not None:
+            self._temp.close()
+        if self._temp_file is not None and os.path.exists(self._temp_file):
+            os.remove(self._temp_file)
+        self._temp_file = None
+
+
+def default_cache_file(output_file, cache_dir=None):
+    """
+    输出文件对应的增量缓存文件路径
+
+    缓存放在缓存目录中，按输出文件的绝对路径区分；
+    不放在输出文件旁边，避免缓存文件进入站点的静态目录，触发重新构建或被一并发布。
+
+    参数:
+        output_file: 输出文件路径
+        cache_dir: 缓存目录，默认为 DEFAULT_CACHE_DIR
+    """
+    key = _digest(os.path.normcase(os.path.abspath(output_file)))
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f'{key}.json')
+
+
+# default_cache_file 生成的缓存文件名，清理时只删除这样的文件
+_CACHE_NAME_RE = re.compile(r'[0-9a-f]{32}\.json')
+
+
+def prune_cache(cache_dir=None, max_age=CACHE_MAX_AGE):
+    """
+    删除缓存目录中超过 max_age 秒没有用到的增量缓存文件
+    每次用到缓存时都会更新它的修改时间，不再处理的输出文件对应的缓存最终都会被清理
+
+    参数:
+        cache_dir: 缓存目录，默认为 DEFAULT_CACHE_DIR
+        max_age: 保留的时长（秒）
+
+    返回:
+        删除的文件数
+    """
+    deadline = time.time() - max_age
+    removed = 0
+    try:
+        entries = os.scandir(cache_dir or DEFAULT_CACHE_DIR)
+    except FileNotFoundError:
+        return 0
+    with entries:
+        for entry in entries:
+            if not _CACHE_NAME_RE.fullmatch(entry.name):
+                continue
+            try:
+                if entry.stat().st_mtime < deadline:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def _load_cache(cache_file, fingerprint):
+    """
+    读取增量缓存；文件缺失、损坏或规则已变化时返回 None
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict):
+        return None
+    if cache.get('version') != CACHE_VERSION or cache.get('fingerprint') != fingerprint:
+        return None
+    return cache
+
+
+def translate_openapi_spec(input_file, output_file, mode='line', cache_file=None, use_cache=True,
+                           verbose=True, locale=DEFAULT_LOCALE, profile=None, cache_dir=None):
     """
     翻译 OpenAPI 规范文件
     为 YAML 文件添加中文注释和翻译
     
+    输入按行惰性读取、按片段添加注释，并经缓冲写入输出，
+    内存占用只取决于最大的片段而不是文件大小。
+    
+    重复运行是幂等的：之前生成的文件头和注释会被识别并去掉后重新生成。
+    每个片段的内容哈希记录在旁路缓存中，再次运行时只重新处理有变化的片段；
+    输入和输出都没有变化时直接返回，不写入任何文件。
+    
+    输出边生成边与已有文件比较，内容相同时不写入、不改变修改时间；
+    有变化时写入临时文件后原子替换，中途出错不会留下写了一半的文件。
+    
     参数:
         input_file: 输入文件路径
         output_file: 输出文件路径
+        mode: 'line' 按行文本匹配规则（默认），'path' 按 YAML 路径匹配规则
+        cache_file: 增量缓存文件路径，默认为缓存目录中按输出文件区分的文件
+        use_cache: 是否使用增量缓存
+        verbose: 是否打印处理结果
+        locale: 规则目录的语言
+        profile: RuleProfile，提供时记录每条规则的命中次数和耗时；
+                 为了统计完整，此时不复用缓存中的片段，所有片段都会重新处理
+        cache_dir: 未指定 cache_file 时缓存文件所在的目录，默认为 DEFAULT_CACHE_DIR
+    
+    返回:
+        处理统计 {'lines': 输入的行数（跳过时取自缓存）, 'sections': 片段数, 'processed': 重新处理的片段数,
+                  'skipped': 是否跳过, 'written': 是否写入了输出文件}
     """
+    rules = get_rules(mode, locale)
     
-    # 读取输入文件
-    with open(input_file, 'r', encoding='utf-8') as f:
-        content = f.read()
+    cache = None
+    if use_cache:
+        cache_file = cache_file or default_cache_file(output_file, cache_dir)
+        input_hash = _file_digest(input_file)
+        if profile is None:
+            cache = _load_cache(cache_file, rules.fingerprint)
+        if cache is not None:
+            # 内容没变化时缓存文件不会重写，更新修改时间记录这次使用，prune_cache 据此清理
+            try:
+                os.utime(cache_file)
+            except OSError:
+                pass
     
-    # 添加文件开头的注释
-    file_header = """# OpenAPI 规范文件
-# 本文件定义了 Web Check API 的所有端点、参数、响应和数据模型
-# OpenAPI 规范（原 Swagger 规范）是一种用于描述 REST API 的标准格式
-# 版本 3.0.0 提供了完整的 API 文档，包括请求/响应格式、认证方式等
-
-"""
+    output_valid = False
+    if cache is not None:
+        if os.path.exists(output_file) and os.path.samefile(input_file, output_file):
+            existing_hash = input_hash
+        else:
+            existing_hash = _file_digest(output_file)
+        output_valid = existing_hash == cache['output_hash']
+    if output_valid and input_hash in (cache['input_hash'], cache['output_hash']):
+        if verbose:
+            print(f"✅ 文件未变化，跳过处理")
+            print(f"输入文件: {input_file}")
+            print(f"输出文件: {output_file}")
+        # 输入是上次的输入或输出，去掉注释后的内容相同，行数也就与上次相同
+        return {'lines': cache['lines'], 'sections': len(cache['sections']), 'processed': 0,
+                'skipped': True, 'written': False}
     
-    # 在文件开头添加注释
-    content = file_header + content
+    known = {key: digest for key, _, digest in cache['sections']} if cache else {}
+    previous = _PreviousOutput(output_file, cache['sections']) if output_valid else None
     
-    # 翻译和添加注释的规则字典
-    # 格式: (匹配模式, 替换内容)
-    replacements = [
-        # OpenAPI 版本
-        (r'^(openapi:\s*3\.0\.0)$', r'# OpenAPI 规范版本\n# OpenAPI 规范（原 Swagger 规范）是一种用于描述 REST API 的标准格式\n# 版本 3.0.0 是当前主要版本，提供了比 2.0 版本更强大的功能\n\1'),
-        
-        # info 部分
-        (r'^(info:)$', r'# API 信息部分\n\1'),
-        (r'^(  title: Web Check 🕵)$', r'# API 标题\n\1'),
-        (r'^(  description: >)$', r'# API 描述\n\1'),
-        (r'^(\*\*API documentation for the \[Web Check\]\(https://github\.com/lissy93/web-check\) backend endpoints\.\*\*<br>)$', r'**[Web Check](https://github.com/lissy93/web-check) 后端端点的 API 文档。**<br>'),
-        (r'^(_Web Check gives you x-ray vision, revealing the configration and inner workings of any website\._)$', r'_Web Check 为您提供 X 射线般的视野，揭示任何网站的配置和内部工作原理。_'),
-        (r'^(  version: 1\.0\.0)$', r'# API 版本\n\1'),
-        (r'^(  license:)$', r'# 许可证信息\n\1'),
-        (r'^(    name: \'License: MIT\')$', r'# 许可证名称：MIT 开源许可证\n\1'),
-        (r'^(    url: https://github\.com/Lissy93/web-check/blob/master/LICENSE)$', r'# 许可证详细信息的 URL\n\1'),
-        (r'^(  termsOfService: https://web-check\.xyz/about#terms-info)$', r'# 服务条款 URL\n\1'),
-        
-        # externalDocs 部分
-        (r'^(externalDocs:)$', r'# 外部文档\n\1'),
-        (r'^(  description: \'Source: GitHub\')$', r'# 外部文档描述：源代码在 GitHub\n\1'),
-        (r'^(  url: https://github\.com/lissy93/web-check)$', r'# 外部文档的 URL\n\1'),
-        
-        # servers 部分
-        (r'^(servers:)$', r'# 服务器配置\n# 定义 API 可用的服务器端点\n\1'),
-        (r'^(  - url: http://localhost:3001/api)$', r'# 本地开发服务器\n\1'),
-        (r'^(    description: Local \(Development\))$', r'# 服务器描述：本地开发环境\n\1'),
-        (r'^(  - url: http://localhost:3000/api)$', r'# 本地生产服务器\n\1'),
-        (r'^(    description: Local \(Production\))$', r'# 服务器描述：本地生产环境\n\1'),
-        (r'^(  - url: https://web-check\.xyz/api)$', r'# Vercel 部署的公共演示服务器\n\1'),
-        (r'^(    description: Public Demo \(Vercel\))$', r'# 服务器描述：Vercel 部署的公共演示\n\1'),
-        (r'^(  - url: https://web-check\.as93\.net/api)$', r'# Netlify 部署的公共演示服务器\n\1'),
-        (r'^(    description: Public Demo \(Netlify\))$', r'# 服务器描述：Netlify 部署的公共演示\n\1'),
-        
-        # tags 部分
-        (r'^(tags:)$', r'# API 标签\n# 用于对 API 端点进行分类和组织\n\1'),
-        (r'^(  - name: Quality & Info)$', r'# 质量与信息标签\n\1'),
-        (r'^(    description: Endpoints providing quality metrics, and general website information\.)$', r'# 标签描述：提供质量指标和一般网站信息的端点\n\1'),
-        (r'^(  - name: Security)$', r'# 安全标签\n\1'),
-        (r'^(    description: Endpoints related to website and server security configurations\.)$', r'# 标签描述：与网站和服务器安全配置相关的端点\n\1'),
-        (r'^(  - name: Server Info)$', r'# 服务器信息标签\n\1'),
-        (r'^(    description: Endpoints providing information about the server hosting the website\.)$', r'# 标签描述：提供托管网站的服务器信息的端点\n\1'),
-        (r'^(  - name: Client-Side Information)$', r'# 客户端信息标签\n\1'),
-        (r'^(    description: Endpoints providing metrics about the website\'s client-side content\.)$', r'# 标签描述：提供网站客户端内容指标的端点\n\1'),
-        
-        # components 部分
-        (r'^(components:)$', r'# 组件定义\n# 定义可重用的组件，如响应、参数、模式等\n\1'),
-        (r'^(  responses:)$', r'# 响应组件\n# 定义可重用的响应模板\n\1'),
-        (r'^(    Error:)$', r'# 错误响应\n\1'),
-        (r'^(      description: Internal Server Error - An error occurred while processing the request\.)$', r'# 内部服务器错误 - 处理请求时发生错误\n\1'),
-        (r'^(    Skipped:)$', r'# 跳过响应\n\1'),
-        (r'^(      description: No Content - The request was successful, but no content is returned\.)$', r'# 无内容 - 请求成功，但没有返回内容\n\1'),
-        (r'^(    MissingParam:)$', r'# 缺少参数响应\n\1'),
-        (r'^(      description: Bad Request - Missing or incorrect input parameters\.)$', r'# 错误请求 - 缺少或错误的输入参数\n\1'),
-        (r'^(    Unauthorized:)$', r'# 未授权响应\n\1'),
-        (r'^(      description: Unauthorized - Authentication credentials were missing or incorrect\.)$', r'# 未授权 - 身份验证凭据缺失或错误\n\1'),
-        (r'^(    Forbidden:)$', r'# 禁止访问响应\n\1'),
-        (r'^(      description: Forbidden - The credentials provided do not grant the necessary permissions\.)$', r'# 禁止访问 - 提供的凭据不授予必要的权限\n\1'),
-        (r'^(    TooManyRequests:)$', r'# 请求过多响应\n\1'),
-        (r'^(      description: Too Many Requests - Rate limit exceeded\.)$', r'# 请求过多 - 超过速率限制\n\1'),
-        
-        # schemas 部分
-        (r'^(  schemas:)$', r'# 数据模式（Schemas）\n# 定义可重用的数据模型\n\1'),
-        (r'^(    ErrorResponse:)$', r'# 错误响应模式\n\1'),
-        (r'^(      type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(      properties:)$', r'# 对象属性\n\1'),
-        (r'^(        error:)$', r'# 错误信息\n\1'),
-        (r'^(          type: string)$', r'# 数据类型：字符串\n\1'),
-        (r'^(          description: A description of the error)$', r'# 错误描述\n\1'),
-        (r'^(    SkippedResponse:)$', r'# 跳过响应模式\n\1'),
-        (r'^(        skipped:)$', r'# 跳过原因\n\1'),
-        (r'^(          description: A description of why the check was skipped)$', r'# 检查被跳过的原因描述\n\1'),
-        
-        # paths 部分
-        (r'^(paths:)$', r'# API 路径（端点）\n# 定义所有 API 端点的路径、方法、参数和响应\n\1'),
+    # 输入和输出可能是同一个文件：输出先与原文件比较，有差异时才写入临时文件，最后原子替换
+    out = _ChangedFileWriter(output_file)
+    sections = []
+    processed = 0
+    line_count = 0
+    try:
+        # 去掉之前生成的注释，在文件开头添加注释，再逐片段应用所有替换规则
+        items = _strip_lines(_read_lines(input_file), rules)
+        for base, lines, raw, complete in _iter_sections(items):
+            line_count += len(lines)
+            key = _digest(repr(base) + '\n' + '\n'.join(lines))
+            
+            annotated = previous.take(key) if previous is not None else None
+            if annotated is None and complete and key in known:
+                # 输入本身就是上次的输出（原地处理）时，直接取输入中对应的行
+                if _digest('\n'.join(raw)) == known[key]:
+                    annotated = raw
+            if annotated is None:
+                annotated = rules.annotate_lines(lines, base, profile)
+                processed += 1
+            
+            if sections:
+                out.write('\n')
+            out.write('\n'.join(annotated))
+            sections.append([key, len(annotated), _digest('\n'.join(annotated))])
         
-        # /archives 端点
-        (r'^(  /archives:)$', r'# 归档数据端点\n# 获取网站的历史归档信息（来自 Wayback Machine）\n\1'),
-        (r'^(    get:)$', r'# GET 方法\n\1'),
-        (r'^(      summary: Retrieve archive data)$', r'# 摘要：获取归档数据\n\1'),
-        (r'^(      tags:)$', r'# 标签\n\1'),
-        (r'^(        - Quality & Info)$', r'# 归类到"质量与信息"标签\n\1'),
-        (r'^(      parameters:)$', r'# 请求参数\n\1'),
-        (r'^(        - name: url)$', r'# URL 参数\n\1'),
-        (r'^(          in: query)$', r'# 参数位置：查询字符串\n\1'),
-        (r'^(          required: true)$', r'# 是否必需：是\n\1'),
-        (r'^(          description: The URL to fetch results about)$', r'# 要获取结果的 URL\n\1'),
-        (r'^(          schema:)$', r'# 参数模式\n\1'),
-        (r'^(            type: string)$', r'# 数据类型：字符串\n\1'),
-        (r'^(      responses:)$', r'# 响应定义\n\1'),
-        (r"^(        '200':)$", r"# HTTP 200 响应 - 成功\n\1"),
-        (r'^(          description: Successful response)$', r'# 响应描述：成功\n\1'),
-        (r'^(          content:)$', r'# 响应内容\n\1'),
-        (r'^(            application/json:)$', r'# 内容类型：JSON\n\1'),
-        (r'^(              schema:)$', r'# 响应模式\n\1'),
-        (r'^(                type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                properties:)$', r'# 响应属性\n\1'),
-        (r'^(                  firstScan:)$', r'# 首次扫描时间\n\1'),
-        (r'^(                    type: string)$', r'# 数据类型：字符串\n\1'),
-        (r'^(                    format: date-time)$', r'# 格式：日期时间\n\1'),
-        (r'^(                    description: The timestamp of the first scan)$', r'# 首次扫描的时间戳\n\1'),
-        (r'^(                  lastScan:)$', r'# 最后扫描时间\n\1'),
-        (r'^(                    description: The timestamp of the last scan)$', r'# 最后扫描的时间戳\n\1'),
-        (r'^(                  totalScans:)$', r'# 总扫描次数\n\1'),
-        (r'^(                    type: integer)$', r'# 数据类型：整数\n\1'),
-        (r'^(                    description: The total number of scans)$', r'# 总扫描次数\n\1'),
-        (r'^(                  changeCount:)$', r'# 变更次数\n\1'),
-        (r'^(                    description: The total number of changes)$', r'# 总变更次数\n\1'),
-        (r'^(                  averagePageSize:)$', r'# 平均页面大小\n\1'),
-        (r'^(                    description: The average page size in KB)$', r'# 平均页面大小（KB）\n\1'),
-        (r'^(                  scanFrequency:)$', r'# 扫描频率\n\1'),
-        (r'^(                    type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                    properties:)$', r'# 扫描频率属性\n\1'),
-        (r'^(                      daysBetweenScans:)$', r'# 扫描间隔天数\n\1'),
-        (r'^(                        type: number)$', r'# 数据类型：数字\n\1'),
-        (r'^(                        format: float)$', r'# 格式：浮点数\n\1'),
-        (r'^(                        description: Average days between scans)$', r'# 平均扫描间隔天数\n\1'),
-        (r'^(                      daysBetweenChanges:)$', r'# 变更间隔天数\n\1'),
-        (r'^(                        description: Average days between changes)$', r'# 平均变更间隔天数\n\1'),
-        (r'^(                      scansPerDay:)$', r'# 每日扫描次数\n\1'),
-        (r'^(                        description: Number of scans per day)$', r'# 每天扫描次数\n\1'),
-        (r'^(                      changesPerDay:)$', r'# 每日变更次数\n\1'),
-        (r'^(                        description: Number of changes per day)$', r'# 每天变更次数\n\1'),
-        (r'^(                  scans:)$', r'# 扫描详情列表\n\1'),
-        (r'^(                    type: array)$', r'# 数据类型：数组\n\1'),
-        (r'^(                    items:)$', r'# 数组项\n\1'),
-        (r'^(                      type: array)$', r'# 数据类型：数组\n\1'),
-        (r'^(                      items:)$', r'# 嵌套数组项\n\1'),
-        (r'^(                        type: string)$', r'# 数据类型：字符串\n\1'),
-        (r'^(                      description: List of scan details)$', r'# 扫描详情列表\n\1'),
-        (r'^(                  scanUrl:)$', r'# 扫描 URL\n\1'),
-        (r'^(                    format: uri)$', r'# 格式：URI\n\1'),
-        (r'^(                    description: The URL to the scan)$', r'# 扫描的 URL\n\1'),
-        
-        # /block-lists 端点
-        (r'^(  /block-lists:)$', r'# 阻止列表端点\n# 检查 URL 是否在各种阻止列表中\n\1'),
-        (r'^(      summary: Retrieve block lists data)$', r'# 摘要：获取阻止列表数据\n\1'),
-        (r'^(        - Security)$', r'# 归类到"安全"标签\n\1'),
-        (r'^(                  blocklists:)$', r'# 阻止列表\n\1'),
-        (r'^(                    type: array)$', r'# 数据类型：数组\n\1'),
-        (r'^(                    items:)$', r'# 数组项\n\1'),
-        (r'^(                      type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                      properties:)$', r'# 阻止列表项属性\n\1'),
-        (r'^(                        server:)$', r'# 服务器名称\n\1'),
-        (r'^(                          description: The name of the blocklist server)$', r'# 阻止列表服务器的名称\n\1'),
-        (r'^(                        serverIp:)$', r'# 服务器 IP\n\1'),
-        (r'^(                          description: The IP address of the blocklist server)$', r'# 阻止列表服务器的 IP 地址\n\1'),
-        (r'^(                        isBlocked:)$', r'# 是否被阻止\n\1'),
-        (r'^(                          type: boolean)$', r'# 数据类型：布尔值\n\1'),
-        (r'^(                          description: Whether the URL is blocked by the server)$', r'# URL 是否被服务器阻止\n\1'),
-        
-        # /carbon 端点
-        (r'^(  /carbon:)$', r'# 碳足迹端点\n# 获取网站的碳足迹和环境影响数据\n\1'),
-        (r'^(      summary: Retrieve carbon data)$', r'# 摘要：获取碳足迹数据\n\1'),
-        (r'^(                  statistics:)$', r'# 统计数据\n\1'),
-        (r'^(                    type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                    properties:)$', r'# 统计属性\n\1'),
-        (r'^(                      adjustedBytes:)$', r'# 调整后的字节数\n\1'),
-        (r'^(                        type: number)$', r'# 数据类型：数字\n\1'),
-        (r'^(                        format: float)$', r'# 格式：浮点数\n\1'),
-        (r'^(                        description: Adjusted bytes transferred)$', r'# 传输的调整后字节数\n\1'),
-        (r'^(                      energy:)$', r'# 能源消耗\n\1'),
-        (r'^(                        description: Energy consumption in kWh)$', r'# 能源消耗（千瓦时）\n\1'),
-        (r'^(                      co2:)$', r'# 二氧化碳排放\n\1'),
-        (r'^(                        type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                        properties:)$', r'# CO2 属性\n\1'),
-        (r'^(                          grid:)$', r'# 电网能源\n\1'),
-        (r'^(                            type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                            properties:)$', r'# 电网属性\n\1'),
-        (r'^(                              grams:)$', r'# 克数\n\1'),
-        (r'^(                                description: CO2 emissions in grams from grid energy)$', r'# 电网能源的 CO2 排放量（克）\n\1'),
-        (r'^(                              litres:)$', r'# 升数\n\1'),
-        (r'^(                                description: CO2 emissions in litres from grid energy)$', r'# 电网能源的 CO2 排放量（升）\n\1'),
-        (r'^(                          renewable:)$', r'# 可再生能源\n\1'),
-        (r'^(                            properties:)$', r'# 可再生能源属性\n\1'),
-        (r'^(                              grams:)$', r'# 克数\n\1'),
-        (r'^(                                description: CO2 emissions in grams from renewable energy)$', r'# 可再生能源的 CO2 排放量（克）\n\1'),
-        (r'^(                              litres:)$', r'# 升数\n\1'),
-        (r'^(                                description: CO2 emissions in litres from renewable energy)$', r'# 可再生能源的 CO2 排放量（升）\n\1'),
-        (r'^(                  cleanerThan:)$', r'# 清洁度百分比\n\1'),
-        (r'^(                    type: integer)$', r'# 数据类型：整数\n\1'),
-        (r'^(                    description: Percentage of websites that are less clean than the queried site)$', r'# 比查询网站更不清洁的网站百分比\n\1'),
-        (r'^(                  rating:)$', r'# 环境评级\n\1'),
-        (r'^(                    description: Environmental rating)$', r'# 环境评级（如 A+、A、B 等）\n\1'),
-        (r'^(                  green:)$', r'# 是否绿色\n\1'),
-        (r'^(                    type: boolean)$', r'# 数据类型：布尔值\n\1'),
-        (r'^(                    description: Whether the site is green)$', r'# 网站是否为绿色网站\n\1'),
-        
-        # /cookies 端点
-        (r'^(  /cookies:)$', r'# Cookie 端点\n# 获取网站的 Cookie 信息\n\1'),
-        (r'^(      summary: Retrieve cookies data)$', r'# 摘要：获取 Cookie 数据\n\1'),
-        (r'^(        - Server Info)$', r'# 归类到"服务器信息"标签\n\1'),
-        (r'^(                  headerCookies:)$', r'# HTTP 头中的 Cookie\n\1'),
-        (r'^(                    type: array)$', r'# 数据类型：数组\n\1'),
-        (r'^(                    items:)$', r'# 数组项\n\1'),
-        (r'^(                      type: string)$', r'# 数据类型：字符串\n\1'),
-        (r'^(                      description: List of cookies from the HTTP headers)$', r'# HTTP 头中的 Cookie 列表\n\1'),
-        (r'^(                  clientCookies:)$', r'# 客户端 Cookie\n\1'),
-        (r'^(                    items:)$', r'# 数组项\n\1'),
-        (r'^(                      type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                      properties:)$', r'# Cookie 属性\n\1'),
-        (r'^(                        name:)$', r'# Cookie 名称\n\1'),
-        (r'^(                          description: The name of the cookie)$', r'# Cookie 的名称\n\1'),
-        (r'^(                        value:)$', r'# Cookie 值\n\1'),
-        (r'^(                          description: The value of the cookie)$', r'# Cookie 的值\n\1'),
-        (r'^(                        domain:)$', r'# Cookie 域名\n\1'),
-        (r'^(                          description: The domain of the cookie)$', r'# Cookie 的域名\n\1'),
-        (r'^(                        path:)$', r'# Cookie 路径\n\1'),
-        (r'^(                          description: The path of the cookie)$', r'# Cookie 的路径\n\1'),
-        (r'^(                        expires:)$', r'# Cookie 过期时间\n\1'),
-        (r'^(                          format: float)$', r'# 格式：浮点数\n\1'),
-        (r'^(                          description: The expiration time of the cookie in Unix time)$', r'# Cookie 的过期时间（Unix 时间戳）\n\1'),
-        (r'^(                        size:)$', r'# Cookie 大小\n\1'),
-        (r'^(                          type: integer)$', r'# 数据类型：整数\n\1'),
-        (r'^(                          description: The size of the cookie)$', r'# Cookie 的大小（字节）\n\1'),
-        (r'^(                        httpOnly:)$', r'# HttpOnly 属性\n\1'),
-        (r'^(                          type: boolean)$', r'# 数据类型：布尔值\n\1'),
-        (r'^(                          description: Whether the cookie is HttpOnly)$', r'# Cookie 是否为 HttpOnly\n\1'),
-        (r'^(                        secure:)$', r'# Secure 属性\n\1'),
-        (r'^(                          description: Whether the cookie is Secure)$', r'# Cookie 是否为 Secure\n\1'),
-        (r'^(                        session:)$', r'# 会话 Cookie\n\1'),
-        (r'^(                          type: boolean)$', r'# 数据类型：布尔值\n\1'),
-        (r'^(                          description: Whether the cookie is a session cookie)$', r'# Cookie 是否为会话 Cookie\n\1'),
-        (r'^(                        sameSite:)$', r'# SameSite 属性\n\1'),
-        (r'^(                          description: The SameSite attribute of the cookie)$', r'# Cookie 的 SameSite 属性\n\1'),
-        (r'^(                        priority:)$', r'# Cookie 优先级\n\1'),
-        (r'^(                          description: The priority of the cookie)$', r'# Cookie 的优先级\n\1'),
-        (r'^(                        sameParty:)$', r'# SameParty 属性\n\1'),
-        (r'^(                          description: Whether the cookie is SameParty)$', r'# Cookie 是否为 SameParty\n\1'),
-        (r'^(                        sourceScheme:)$', r'# 源协议\n\1'),
-        (r'^(                          description: The source scheme of the cookie)$', r'# Cookie 的源协议\n\1'),
-        
-        # /dns-server 端点
-        (r'^(  /dns-server:)$', r'# DNS 服务器端点\n# 获取网站的 DNS 服务器信息\n\1'),
-        (r'^(      summary: Retrieve DNS server data)$', r'# 摘要：获取 DNS 服务器数据\n\1'),
-        (r'^(                  domain:)$', r'# 域名\n\1'),
-        (r'^(                    description: The domain name queried)$', r'# 查询的域名\n\1'),
-        (r'^(                  dns:)$', r'# DNS 服务器列表\n\1'),
-        (r'^(                    items:)$', r'# 数组项\n\1'),
-        (r'^(                      type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                      properties:)$', r'# DNS 服务器属性\n\1'),
-        (r'^(                        address:)$', r'# IP 地址\n\1'),
-        (r'^(                          description: The IP address of the DNS server)$', r'# DNS 服务器的 IP 地址\n\1'),
-        (r'^(                        hostname:)$', r'# 主机名\n\1'),
-        (r'^(                          type: array)$', r'# 数据类型：数组\n\1'),
-        (r'^(                          items:)$', r'# 数组项\n\1'),
-        (r'^(                            type: string)$', r'# 数据类型：字符串\n\1'),
-        (r'^(                          description: Hostnames associated with the DNS server)$', r'# 与 DNS 服务器关联的主机名\n\1'),
-        (r'^(                          nullable: true)$', r'# 可为空\n\1'),
-        (r'^(                        dohDirectSupports:)$', r'# DoH 支持\n\1'),
-        (r'^(                          type: boolean)$', r'# 数据类型：布尔值\n\1'),
-        (r'^(                          description: Whether the server supports DoH \(DNS over HTTPS\) directly)$', r'# 服务器是否直接支持 DoH（DNS over HTTPS）\n\1'),
-        
-        # /dns 端点
-        (r'^(  /dns:)$', r'# DNS 端点\n# 获取网站的 DNS 记录\n\1'),
-        (r'^(      summary: Retrieve DNS data)$', r'# 摘要：获取 DNS 数据\n\1'),
-        (r'^(                  A:)$', r'# A 记录（IPv4 地址）\n\1'),
-        (r'^(                    type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                    properties:)$', r'# A 记录属性\n\1'),
-        (r'^(                      address:)$', r'# IP 地址\n\1'),
-        (r'^(                        description: IPv4 address)$', r'# IPv4 地址\n\1'),
-        (r'^(                      family:)$', r'# IP 协议族\n\1'),
-        (r'^(                        type: integer)$', r'# 数据类型：整数\n\1'),
-        (r'^(                        description: IP family)$', r'# IP 协议族（4 表示 IPv4，6 表示 IPv6）\n\1'),
-        (r'^(                  AAAA:)$', r'# AAAA 记录（IPv6 地址）\n\1'),
-        (r'^(                    type: array)$', r'# 数据类型：数组\n\1'),
-        (r'^(                    items:)$', r'# 数组项\n\1'),
-        (r'^(                      type: string)$', r'# 数据类型：字符串\n\1'),
-        (r'^(                    description: List of IPv6 addresses)$', r'# IPv6 地址列表\n\1'),
-        (r'^(                  MX:)$', r'# MX 记录（邮件交换服务器）\n\1'),
-        (r'^(                    type: array)$', r'# 数据类型：数组\n\1'),
-        (r'^(                    items:)$', r'# 数组项\n\1'),
-        (r'^(                      type: string)$', r'# 数据类型：字符串\n\1'),
-        (r'^(                    description: List of mail exchange servers)$', r'# 邮件交换服务器列表\n\1'),
-        (r'^(                  TXT:)$', r'# TXT 记录\n\1'),
-        (r'^(                    type: array)$', r'# 数据类型：数组\n\1'),
-        (r'^(                    items:)$', r'# 数组项\n\1'),
-        (r'^(                      type: object)$', r'# 数据类型：对象\n\1'),
-        (r'^(                      properties:)$', r'# TXT 记录属性\n\1'),
-        (r'^(                        exchange:)$', r'# 交换服务器\n\1'),
-        (r'^(                          description: Exchange server)$', r'# 交换服务器\n\1'),
-        (r'^(                        priority:)$', r'# 优先级\n\1'),
-        (r'^(                          description: Priority of the DNS record)$', r'# DNS 记录的优先级\n\1'),
-    ]
-    
-    # 应用所有替换规则
-    for pattern, replacement in replacements:
-        content = re.sub(pattern, replacement, content, flags=re.MULTILINE)
+        if previous is not None:
+            previous.close()
+            previous = None
+        written = out.commit()
+    except BaseException:
+        out.abort()
+        raise
+    finally:
+        if previous is not None:
+            previous.close()
     
-    # 写入输出文件
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(content)
+    if use_cache:
+        # 缓存文件同样只在内容变化时原子替换；写入失败（如目录只读）不影响输出
+        try:
+            os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+            cache_out = _ChangedFileWriter(cache_file)
+            try:
+                cache_out.write(json.dumps({
+                    'version': CACHE_VERSION,
+                    'fingerprint': rules.fingerprint,
+                    'input_hash': input_hash,
+                    'output_hash': out.hexdigest(),
+                    'lines': line_count,
+                    'sections': sections,
+                }))
+                cache_out.commit()
+            except BaseException:
+                cache_out.abort()
+                raise
+        except OSError:
+            pass
     
-    print(f"✅ 文件处理完成！")
-    print(f"输入文件: {input_file}")
-    print(f"输出文件: {output_file}")
+    if verbose:
+        print(f"✅ 文件处理完成！" if written else f"✅ 文件处理完成，内容未变化，未写入")
+        print(f"输入文件: {input_file}")
+        print(f"输出文件: {output_file}")
+        print(f"重新处理的片段: {processed}/{len(sections)}")
+    return {'lines': line_count, 'sections': len(sections), 'processed': processed, 'skipped': False,
+            'written': written}
+
+
+class Annotator:
+    """
+    可在进程内复用的注释器，供服务端直接调用
+
+    创建时载入编译后的规则（以及翻译记忆），之后的方法只做内存中的计算，
+    不读写文件、不打印，可以在多个线程间共享。
+    结果与 translate_openapi_spec 写出的文件内容完全相同。
+
+    annotate / annotate_bytes 的结果按规范的 ETag（或内容哈希）缓存，
+    同一版本的规范只计算一次；同一版本的并发请求会等待第一次计算的结果。
+    """
+
+    def __init__(self, mode='line', locale=DEFAULT_LOCALE, rules=None, cache_size=8):
+        """
+        参数:
+            mode: 'line' 按行文本匹配规则（默认），'path' 按 YAML 路径匹配规则
+            locale: 规则目录的语言
+            rules: 已编译的规则集，默认按 mode 和 locale 载入
+            cache_size: 缓存的注释结果个数，为 0 时不缓存
+        """
+        self.mode = mode
+        self.locale = locale
+        self.rules = rules or get_rules(mode, locale)
+        if self.rules.memory is not None:
+            self.rules.memory.preload()
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        # 缓存键 -> 正在计算该结果的锁
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def annotate_stream(self, lines):
+        """
+        逐片段添加注释，适合边读边处理的大文件
+
+        参数:
+            lines: 不含换行符（包括 \r）的行（可迭代对象），与对按文本模式读入的内容执行
+                str.split('\n') 的结果相同
+
+        返回:
+            逐行产出添加注释后的行（不含换行符）的生成器
+        """
+        rules = self.rules
+        for base, section, _, _ in _iter_sections(_strip_lines(lines, rules)):
+            yield from rules.annotate_lines(section, base)
+
+    def annotate(self, text, etag=None):
+        """
+        为整段规范文本添加注释
+
+        参数:
+            text: 规范文件的内容
+            etag: 规范的 ETag，作为缓存键；默认使用内容的哈希
+
+        返回:
+            添加注释后的内容
+        """
+        key = ('text', etag if etag is not None else _digest(text))
+        return self._cached(key, lambda: self._annotate_text(text))
+
+    def annotate_bytes(self, buf, etag=None):
+        """
+        为 UTF-8 编码的规范内容添加注释
+
+        参数:
+            buf: 规范文件的内容（bytes）
+            etag: 规范的 ETag，作为缓存键；默认使用内容的哈希
+
+        返回:
+            添加注释后的内容（UTF-8 编码的 bytes）
+        """
+        if etag is None:
+            etag = hashlib.blake2b(buf, digest_size=16).hexdigest()
+        # 只缓存 bytes 结果，同一版本只占一个缓存条目
+        return self._cached(('bytes', etag),
+                            lambda: self._annotate_text(buf.decode('utf-8')).encode('utf-8'))
+
+    def _annotate_text(self, text):
+        """
+        为整段文本添加注释，不经过缓存
+        """
+        # 与按文本模式读取文件一致：\r\n 和单独的 \r 都视为换行
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return '\n'.join(self.annotate_stream(text.split('\n')))
+
+    def clear_cache(self):
+        """
+        清空缓存的注释结果
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, key, compute):
+        """
+        从缓存中取结果，没有时计算并放入缓存；同一个键同时只计算一次
+        """
+        if not self.cache_size:
+            return compute()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            pending = self._pending.setdefault(key, threading.Lock())
+
+        with pending:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key]
+            try:
+                value = compute()
+                with self._lock:
+                    self._cache[key] = value
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return value
+
+
+def _common_prefix(old, new, chunk=1 << 16):
+    """
+    两段字节串相同前缀的长度，逐块比较，找到不同的块后在块内二分
+    """
+    size = min(len(old), len(new))
+    start = 0
+    while start < size:
+        end = min(start + chunk, size)
+        if old[start:end] != new[start:end]:
+            while end - start > 1:
+                middle = (start + end) // 2
+                if old[start:middle] == new[start:middle]:
+                    start = middle
+                else:
+                    end = middle
+            return start
+        start = end
+    return size
+
+
+def _common_suffix(old, new, limit, chunk=1 << 16):
+    """
+    两段字节串相同后缀的长度，最多为 limit
+    """
+    start = 0
+    while start < limit:
+        end = min(start + chunk, limit)
+        if old[len(old) - end:len(old) - start] != new[len(new) - end:len(new) - start]:
+            while end - start > 1:
+                middle = (start + end) // 2
+                if old[len(old) - middle:len(old) - start] == new[len(new) - middle:len(new) - start]:
+                    start = middle
+                else:
+                    end = middle
+            return start
+        start = end
+    return limit
+
+
+def _stat_key(path):
+    """
+    用于判断文件是否变化的 stat 信息，文件不存在时返回 None
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _write_atomic(output_file, data):
+    """
+    把内容写入同目录下的临时文件，fsync 后原子替换输出文件
+    输出文件是符号链接时替换链接指向的文件
+    """
+    output_file = os.path.realpath(output_file)
+    directory, name = os.path.split(output_file)
+    fd, temp_file = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+    try:
+        with open(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace_file(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+class SpecWatcher:
+    """
+    监视模式：常驻进程，输入文件变化时只重新处理被改动的片段
+
+    编译后的规则、上次的输入和输出内容，以及每个片段的字节范围和注释结果都保存在内存中。
+    文件变化后先找出与上次内容相同的前缀和后缀，只对中间被改动的片段（前后各多取一个）
+    重新划分和添加注释，再把结果拼接到上次输出中对应的位置，
+    耗时取决于改动的大小，与文件大小有关的只剩字节串的比较和复制。
+    """
+
+    def __init__(self, input_file, output_file, mode='line', locale=DEFAULT_LOCALE):
+        """
+        参数:
+            input_file: 监视的输入文件
+            output_file: 输出文件，可以与输入文件相同
+            mode: 注释模式
+            locale: 规则目录的语言
+        """
+        self.input_file = input_file
+        self.output_file = output_file
+        self.rules = get_rules(mode, locale)
+        # 上次处理的输入内容和写出的输出内容（原地处理时是同一个对象）
+        self._data = b''
+        self._output = b''
+        # [(片段根节点路径, 在输入中的字节数（按每行都有换行计算）, 片段哈希, 注释结果, 片段的第一行), ...]
+        self._blocks = []
+        # 每个片段在输入中和在输出中的起始位置
+        self._offsets = []
+        self._output_offsets = []
+        # 上次处理时输入文件和输出文件的 stat
+        self._stat = None
+        self._output_stat = None
+
+    def poll(self):
+        """
+        检查输入文件的 stat，有变化时更新输出
+
+        返回:
+            处理统计；文件未变化或暂时不存在（编辑器正在保存）时返回 None
+        """
+        stat = _stat_key(self.input_file)
+        if stat is None or stat == self._stat:
+            return None
+        self._stat = stat
+        return self.update()
+
+    def _block_at(self, position):
+        """
+        包含某个字节位置的片段序号
+        """
+        return max(bisect.bisect_right(self._offsets, position) - 1, 0)
+
+    def _changed_range(self, data):
+        """
+        找出需要重新处理的片段范围
+
+        返回:
+            (第一个片段序号, 最后一个片段序号)；没有可复用的片段时返回 None
+        """
+        old = self._data
+        blocks = self._blocks
+        if not blocks:
+            return None
+        prefix = _common_prefix(old, data)
+        suffix = _common_suffix(old, data, min(len(old), len(data)) - prefix)
+
+        # 改动可能影响前一个片段的结尾（如在片段末尾追加了行），前后各多取一个片段
+        first = max(self._block_at(prefix) - 1, 0)
+        last = min(self._block_at(max(len(old) - suffix - 1, prefix)) + 1, len(blocks) - 1)
+        # 保留的后缀必须从新内容的行首开始
+        while last < len(blocks) - 1:
+            tail = len(old) - self._offsets[last + 1]
+            if tail <= suffix and data[len(data) - tail - 1:len(data) - tail] == b'\n':
+                break
+            last += 1
+        return first, last
+
+    def update(self):
+        """
+        读取输入文件，重新处理被改动的片段并写入输出
+
+        返回:
+            {'sections': 片段数, 'processed': 重新处理的片段数, 'written': 是否写入了输出文件,
+             'seconds': 耗时}
+        """
+        started = time.perf_counter()
+        with open(self.input_file, 'rb') as f:
+            data = f.read()
+        # 与完整处理时按文本模式读取一致：\r\n 和单独的 \r 都视为换行，字节范围按换行后的内容计算
+        normalized = b'\r' in data
+        if normalized:
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        in_place = os.path.exists(self.output_file) and os.path.samefile(self.input_file,
+                                                                          self.output_file)
+        blocks = self._blocks
+        if data == self._data and blocks and not (normalized and in_place):
+            return {'sections': len(blocks), 'processed': 0, 'written': False,
+                    'seconds': time.perf_counter() - started}
+
+        found = self._changed_range(data)
+        if found is None:
+            first, last = 0, -1
+            start, tail = 0, 0
+        else:
+            first, last = found
+            start = self._offsets[first]
+            # 最后一个片段末尾没有换行，长度按多一个字节记录
+            tail = max(len(self._data) - self._offsets[last] - blocks[last][1], 0)
+
+        while True:
+            new_blocks, processed, opened = self._annotate_region(data, first, last, start, tail)
+            following = last + 1
+            # 改动可能改变了后面片段所处的路径（如重命名了顶层键），这时继续处理到文件末尾
+            if following >= len(blocks) or _section_base(blocks[following][4], opened) == \
+                    blocks[following][0]:
+                break
+            last, tail = len(blocks) - 1, 0
+
+        # 把新的注释结果拼接到上次输出中对应的位置
+        middle = b'\n'.join(block[3] for block in new_blocks)
+        if first <= last:
+            output_start = self._output_offsets[first]
+            output_end = self._output_offsets[last] + len(blocks[last][3])
+        else:
+            output_start = output_end = 0
+        old_output = memoryview(self._output)
+        output = b''.join((old_output[:output_start], middle, old_output[output_end:]))
+        if in_place:
+            # 原地处理：刚读入的内容就是输出文件现在的内容（换行被转换过时总要重写）
+            written = self._write(output, normalized or output != data, trusted=True)
+        else:
+            written = self._write(output, middle != old_output[output_start:output_end])
+        old_output.release()
+
+        blocks = blocks[:first] + new_blocks + blocks[last + 1:]
+        if in_place:
+            # 原地处理：输出就是下次的输入，片段范围改为注释结果的长度
+            blocks = [(base, len(annotated) + 1, key, annotated, first_line)
+                      for base, _, key, annotated, first_line in blocks]
+            data = output
+            self._stat = self._output_stat
+
+        self._data = data
+        self._output = output
+        self._blocks = blocks
+        self._offsets = list(itertools.accumulate((block[1] for block in blocks[:-1]), initial=0))
+        self._output_offsets = list(
+            itertools.accumulate((len(block[3]) + 1 for block in blocks[:-1]), initial=0))
+        return {'sections': len(blocks), 'processed': processed, 'written': written,
+                'seconds': time.perf_counter() - started}
+
+    def _annotate_region(self, data, first, last, start, tail):
+        """
+        重新划分并处理输入中从 start 开始、末尾去掉 tail 个字节的部分
+        这部分原来是第 first 到第 last 个片段，其中内容没变的片段直接复用注释结果
+
+        返回:
+            (片段列表, 重新处理的片段数, 末尾各层已打开的映射键)
+        """
+        known = {block[2]: block[3] for block in self._blocks[first:last + 1]}
+        text = data[start:len(data) - tail].decode('utf-8')
+        lines = text.split('\n')
+        if tail:
+            # 去掉与后面片段之间的换行
+            lines.pop()
+
+        opened = list(self._blocks[first][0]) if self._blocks else []
+        # 输入中缺少文件头时，补上的文件头单独成为第一个片段，在输入中不占字节
+        items = _strip_lines(lines, self.rules, header=first == 0)
+        new_blocks = []
+        processed = 0
+        for base, section, raw, _ in _iter_sections(items, opened):
+            key = _digest(repr(base) + '\n' + '\n'.join(section))
+            annotated = known.get(key)
+            if annotated is None:
+                annotated = '\n'.join(self.rules.annotate_lines(section, base)).encode('utf-8')
+                processed += 1
+            size = sum(len(line.encode('utf-8')) + 1 for line in raw)
+            new_blocks.append((base, size, key, annotated, section[0] if section else ''))
+        return new_blocks, processed, opened
+
+    def _write(self, output, changed, trusted=False):
+        """
+        写入输出
+
+        输出文件自上次写入后没有被改动过（或已知其内容）时，只在内容有变化时才写入；
+        否则与已有文件比较后再决定是否写入。
+
+        参数:
+            output: 新的输出内容
+            changed: 与输出文件已知的内容相比是否有变化
+            trusted: 输出文件的内容是否已知，为 False 时检查上次写入后文件是否被改动过
+
+        返回:
+            是否写入了输出文件
+        """
+        if trusted or (self._output_stat is not None
+                       and _stat_key(self.output_file) == self._output_stat):
+            if changed:
+                _write_atomic(self.output_file, output)
+        else:
+            out = _ChangedFileWriter(self.output_file, digest=False)
+            try:
+                out.write(output)
+                changed = out.commit()
+            except BaseException:
+                out.abort()
+                raise
+        self._output_stat = _stat_key(self.output_file)
+        return changed
+
+
+def watch(jobs_list, mode='line', locale=DEFAULT_LOCALE, interval=0.2):
+    """
+    监视多个规范文件，文件变化时更新对应的输出，按 Ctrl+C 退出
+
+    参数:
+        jobs_list: [(输入文件, 输出文件), ...]
+        mode: 注释模式
+        locale: 规则目录的语言
+        interval: 检查文件 stat 的间隔（秒）
+    """
+    watchers = [SpecWatcher(input_file, output_file, mode, locale)
+                for input_file, output_file in jobs_list]
+    print(f"👀 正在监视 {len(watchers)} 个文件，按 Ctrl+C 退出")
+    try:
+        while True:
+            for watcher in watchers:
+                try:
+                    result = watcher.poll()
+                except Exception as exc:
+                    print(f"❌ {watcher.input_file}: {exc}", file=sys.stderr)
+                    continue
+                if result is not None and result['processed']:
+                    print(f"✅ {watcher.input_file}: 重新处理 {result['processed']}/"
+                          f"{result['sections']} 个片段，"
+                          f"{'已写入' if result['written'] else '内容未变化'}，"
+                          f"用时 {result['seconds'] * 1000:.1f} ms")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("已停止监视")
+
+
+def strip_spec(input_file, output_file, mode='line', verbose=True, locale=DEFAULT_LOCALE):
+    """
+    去掉规范文件中生成的注释，还原被替换的译文，得到原始的英文规范
+    单次流式遍历，内存占用与文件大小无关；输出内容没有变化时不写入
+
+    参数:
+        input_file: 添加过注释的输入文件
+        output_file: 输出文件路径，可以与输入文件相同
+        mode: 添加注释时使用的注释模式
+        verbose: 是否打印处理结果
+        locale: 规则目录的语言
+
+    返回:
+        处理统计 {'lines': 输出的行数, 'written': 是否写入了输出文件}
+    """
+    rules = get_rules(mode, locale)
+    out = _ChangedFileWriter(output_file, digest=False)
+    line_count = 0
+    try:
+        lines = _original_lines(_read_lines(input_file), rules)
+        # 按批拼接后写入，减少逐行比较和编码的开销
+        for batch in iter(lambda: list(itertools.islice(lines, 4096)), []):
+            if line_count:
+                out.write('\n')
+            out.write('\n'.join(batch))
+            line_count += len(batch)
+        written = out.commit()
+    except BaseException:
+        out.abort()
+        raise
+
+    if verbose:
+        print(f"✅ 注释已去除！" if written else f"✅ 注释已去除，内容未变化，未写入")
+        print(f"输入文件: {input_file}")
+        print(f"输出文件: {output_file}")
+    return {'lines': line_count, 'written': written}
+
+
+class _LineStream:
+    """
+    把逐行产出的生成器包装成可供 yaml.parse 读取的文件对象
+    """
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._first = True
+
+    def read(self, size=-1):
+        # 每次返回若干行，行之间补上换行符；读完后返回空串
+        batch = list(itertools.islice(self._lines, 1024))
+        if not batch:
+            return ''
+        text = '\n'.join(batch)
+        if not self._first:
+            text = '\n' + text
+        self._first = False
+        return text
+
+
+def _translated_pairs(rules):
+    """
+    规则中整行替换的译文与原文不同的部分，校验时允许两者不一致
+
+    返回:
+        [(译文片段, 原文片段), ...]
+    """
+    pairs = []
+    for translated, original in rules.restored.items():
+        # 去掉两行共同的前缀和后缀（缩进、键名等），只保留被翻译的文本
+        start = len(os.path.commonprefix([translated, original]))
+        end = len(os.path.commonprefix([translated[start:][::-1], original[start:][::-1]]))
+        pairs.append((translated[start:len(translated) - end], original[start:len(original) - end]))
+    return pairs
+
+
+# 普通标量按 YAML 1.1 核心规则解析类型
+_SCALAR_RESOLVER = yaml.resolver.Resolver() if yaml is not None else None
+
+
+def _scalar_tag(event):
+    """
+    标量解析后的类型标签：普通标量按内容推断，带引号和块标量为字符串
+    """
+    if event.tag not in (None, '!'):
+        return event.tag
+    if event.implicit[0]:
+        return _SCALAR_RESOLVER.resolve(yaml.ScalarNode, event.value, (True, False))
+    return 'tag:yaml.org,2002:str'
+
+
+def _shorten(text, limit=60):
+    """
+    截断过长的文本，用于错误信息
+    """
+    return text if len(text) <= limit else text[:limit] + '…'
+
+
+def verify_annotations(original_file, annotated_file, mode='line', locale=DEFAULT_LOCALE):
+    """
+    校验添加注释前后的规范数据是否一致
+
+    两个文件都用 YAML 解析器（有 libyaml 时使用 C 实现）解析为事件流逐个比较，
+    不构造数据对象，内存占用与文件大小无关。事件流相同即解析出的数据树相同
+    （还额外要求键的顺序相同）。标量的值只允许在规则整行替换的译文处不同；
+    注释行若被插入到块标量中，会改变标量的内容而被发现。
+
+    原始文件按去掉注释后的内容解析，因此原地处理后（两个参数为同一个文件）也能校验。
+
+    参数:
+        original_file: 原始（或添加过注释的）规范文件
+        annotated_file: 添加过注释的规范文件
+        mode: 添加注释时使用的注释模式
+        locale: 规则目录的语言
+
+    返回:
+        第一处不一致的说明；数据一致时返回 None
+    """
+    if yaml is None:
+        raise RuntimeError("校验需要 PyYAML，请先安装: pip install pyyaml")
+
+    rules = get_rules(mode, locale)
+    pairs = _translated_pairs(rules)
+    with open(annotated_file, 'r', encoding='utf-8') as f:
+        original_events = yaml.parse(_LineStream(_original_lines(_read_lines(original_file), rules)),
+                                     Loader=_YAML_LOADER)
+        annotated_events = yaml.parse(f, Loader=_YAML_LOADER)
+        scalar = yaml.ScalarEvent
+        for original, annotated in itertools.zip_longest(original_events, annotated_events):
+            # 绝大多数事件完全相同，先做最便宜的比较
+            cls = original.__class__
+            if cls is scalar:
+                if (annotated.__class__ is scalar and original.value == annotated.value
+                        and original.implicit == annotated.implicit
+                        and original.anchor == annotated.anchor and original.tag == annotated.tag):
+                    continue
+            elif cls in _END_EVENTS and annotated.__class__ is cls:
+                continue
+            message = _event_difference(original, annotated, pairs)
+            if message is not None:
+                return message
+    return None
+
+
+# 没有内容需要比较的事件
+_END_EVENTS = tuple(
+    getattr(yaml, name) for name in ('MappingEndEvent', 'SequenceEndEvent', 'DocumentEndEvent',
+                                     'DocumentStartEvent', 'StreamStartEvent', 'StreamEndEvent')
+) if yaml is not None else ()
+
+
+def _event_difference(original, annotated, pairs):
+    """
+    比较两个 YAML 事件解析出的数据是否一致
+
+    参数:
+        original: 原始文件中的事件，事件流已结束时为 None
+        annotated: 添加过注释的文件中的事件，事件流已结束时为 None
+        pairs: 允许不同的 (译文片段, 原文片段)
+
+    返回:
+        不一致的说明；一致时返回 None
+    """
+    if original is None or annotated is None or type(original) is not type(annotated):
+        event = annotated or original
+        return f"第 {event.start_mark.line + 1} 行: 文档结构不一致"
+
+    line = annotated.start_mark.line + 1
+    if isinstance(original, yaml.NodeEvent) and original.anchor != annotated.anchor:
+        return f"第 {line} 行: 锚点不一致"
+    if isinstance(original, yaml.ScalarEvent):
+        value = annotated.value
+        if value != original.value:
+            for translated, source in pairs:
+                value = value.replace(translated, source)
+            if value != original.value:
+                return (f"第 {line} 行: 值不一致，原文 {_shorten(original.value)!r}，"
+                        f"注释后 {_shorten(annotated.value)!r}")
+        if (original.implicit != annotated.implicit or original.tag != annotated.tag) and \
+                _scalar_tag(original) != _scalar_tag(annotated):
+            return f"第 {line} 行: 值的类型不一致"
+    elif isinstance(original, yaml.CollectionStartEvent) and original.tag != annotated.tag:
+        return f"第 {line} 行: 标签不一致"
+    return None
+
+
+# 未指定输入时处理的默认规范文件
+DEFAULT_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'public', 'resources', 'openapi-spec.yml')
+
+# 从目录中查找规范文件时匹配的扩展名
+SPEC_EXTENSIONS = ('.yml', '.yaml')
+
+
+def collect_spec_files(targets):
+    """
+    把命令行中的文件、目录和通配符展开为规范文件列表
+
+    参数:
+        targets: 文件、目录或通配符
+
+    返回:
+        [(输入文件, 相对输出目录的路径), ...]，按出现顺序去重
+        目录保留相对目录的路径，通配符保留相对其中不含通配符的上层目录的路径
+    """
+    found = {}
+    for target in targets:
+        if os.path.isdir(target):
+            # 目录：递归查找，保留相对目录结构
+            for root, dirs, files in os.walk(target):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(SPEC_EXTENSIONS):
+                        path = os.path.join(root, name)
+                        found.setdefault(os.path.abspath(path), os.path.relpath(path, target))
+        elif glob.has_magic(target):
+            # 如 g/*/openapi-spec.yml 相对 g，各版本的文件输出到不同的子目录
+            root = target
+            while glob.has_magic(root):
+                root = os.path.dirname(root)
+            paths = [path for path in sorted(glob.glob(target, recursive=True))
+                     if os.path.isfile(path)]
+            if not paths:
+                raise FileNotFoundError(f"没有匹配的输入文件: {target}")
+            for path in paths:
+                found.setdefault(os.path.abspath(path), os.path.relpath(path, root or os.curdir))
+        elif os.path.isfile(target):
+            found.setdefault(os.path.abspath(target), os.path.basename(target))
+        else:
+            raise FileNotFoundError(f"找不到输入文件: {target}")
+    return list(found.items())
+
+
+def _init_worker(mode, locale):
+    """
+    工作进程初始化：每个进程只载入一次规则集
+    """
+    get_rules(mode, locale)
+
+
+def _translate_one(input_file, output_file, mode, use_cache, locale, profiled, strip=False,
+                   verify=False, cache_dir=None):
+    """
+    在工作进程中处理单个文件，需要统计时把本文件的 RuleProfile 一并返回，
+    需要校验时把校验结果（不一致的说明或 None）一并返回
+    """
+    if strip:
+        # 去除注释前先校验：去除注释后的数据与输入一致，输出也就与输入一致
+        message = verify_annotations(input_file, input_file, mode, locale) if verify else None
+        result = strip_spec(input_file, output_file, mode=mode, verbose=False, locale=locale)
+        result.update(input=input_file, skipped=False, profile=None, verify=message)
+        return result
+
+    profile = RuleProfile() if profiled else None
+    result = translate_openapi_spec(input_file, output_file, mode=mode, use_cache=use_cache,
+                                    verbose=False, locale=locale, profile=profile,
+                                    cache_dir=cache_dir)
+    result['input'] = input_file
+    result['profile'] = profile
+    result['verify'] = verify_annotations(input_file, output_file, mode, locale) if verify else None
+    return result
+
+
+def translate_many(jobs_list, mode='line', jobs=None, use_cache=True, locale=DEFAULT_LOCALE,
+                   profile=None, strip=False, verify=False, cache_dir=None):
+    """
+    并行处理多个规范文件
+
+    参数:
+        jobs_list: [(输入文件, 输出文件), ...]
+        mode: 注释模式
+        jobs: 并行进程数，默认为 CPU 核数；为 1 时在当前进程中依次处理
+        use_cache: 是否使用增量缓存
+        locale: 规则目录的语言
+        profile: RuleProfile，提供时合并所有文件的规则统计
+        strip: 为 True 时去除注释而不是添加注释
+        verify: 是否校验处理前后的数据一致
+        cache_dir: 增量缓存目录，默认为 DEFAULT_CACHE_DIR
+
+    返回:
+        (处理统计列表, [(输入文件, 异常), ...])
+    """
+    jobs = jobs or os.cpu_count() or 1
+    results = []
+    failures = []
+    if jobs == 1 or len(jobs_list) <= 1:
+        for input_file, output_file in jobs_list:
+            try:
+                results.append(_translate_one(input_file, output_file, mode, use_cache, locale,
+                                              profile is not None, strip, verify, cache_dir))
+            except Exception as exc:
+                failures.append((input_file, exc))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(mode, locale)) as executor:
+            futures = {
+                executor.submit(_translate_one, input_file, output_file, mode, use_cache, locale,
+                                profile is not None, strip, verify, cache_dir): input_file
+                for input_file, output_file in jobs_list
+            }
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as exc:
+                    failures.append((futures[future], exc))
+
+    if profile is not None:
+        for result in results:
+            profile.merge(result['profile'])
+    return results, failures
+
+
+def main(argv=None):
+    """
+    命令行入口
+    """
+    parser = argparse.ArgumentParser(description='为 OpenAPI 规范文件添加中文注释')
+    parser.add_argument('targets', nargs='*',
+                        help='要处理的文件、目录或通配符（默认为本仓库的 openapi-spec.yml）')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('-o', '--output-dir', help='输出目录，目录和通配符输入会保留相对路径')
+    output.add_argument('-i', '--in-place', action='store_true', help='直接改写输入文件')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='并行进程数（默认为 CPU 核数）')
+    parser.add_argument('--mode', choices=('line', 'path'), default='line',
+                        help='注释模式：line 按行文本匹配，path 按 YAML 路径匹配')
+    parser.add_argument('--locale', default=DEFAULT_LOCALE, choices=available_locales(),
+                        help=f'规则目录的语言（默认为 {DEFAULT_LOCALE}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用增量缓存')
+    parser.add_argument('--cache-dir',
+                        help='增量缓存目录（默认为规则目录下的 __pycache__/annotate），'
+                             f'超过 {CACHE_MAX_AGE // 86400} 天没有用到的缓存会被清理')
+    parser.add_argument('--profile', action='store_true',
+                        help='统计每条规则的命中次数和耗时，并打印报告')
+    parser.add_argument('--profile-sort', choices=('hits', 'time'), default='hits',
+                        help='报告的排序方式：hits 按命中次数，time 按耗时')
+    parser.add_argument('--profile-json', metavar='FILE', help='把规则统计写入 JSON 文件')
+    parser.add_argument('--strip', action='store_true',
+                        help='去除生成的注释，还原原始的英文规范')
+    parser.add_argument('--verify', action='store_true',
+                        help='校验处理前后解析出的数据一致（只允许译文不同），不一致时返回非零')
+    parser.add_argument('--watch', action='store_true',
+                        help='常驻监视输入文件，变化时只重新处理被改动的片段')
+    parser.add_argument('--interval', type=float, default=0.2,
+                        help='监视模式下检查文件的间隔秒数（默认为 0.2）')
+    args = parser.parse_args(argv)
+    profile = RuleProfile() if args.profile or args.profile_json else None
+
+    if not args.targets:
+        # 兼容旧用法：不带参数时原地处理本仓库的规范文件
+        if args.output_dir:
+            parser.error('未指定输入文件时只能原地处理')
+        args.targets = [DEFAULT_SPEC]
+        args.in_place = True
+    if not args.in_place and not args.output_dir:
+        parser.error('需要指定 --output-dir 或 --in-place')
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs 必须为正整数')
+    if args.watch and (profile is not None or args.strip or args.verify):
+        parser.error('监视模式不支持 --profile、--strip 和 --verify')
+    if args.strip and profile is not None:
+        parser.error('去除注释时不支持 --profile')
+    if args.interval <= 0:
+        parser.error('--interval 必须为正数')
+
+    try:
+        files = collect_spec_files(args.targets)
+    except FileNotFoundError as exc:
+        parser.error(str(exc))
+
+    jobs_list = []
+    # 输出文件 -> 输入文件，多个输入写到同一个输出时报错，避免互相覆盖
+    outputs = {}
+    for input_file, relative in files:
+        if args.in_place:
+            jobs_list.append((input_file, input_file))
+            continue
+        output_file = os.path.join(args.output_dir, relative)
+        other = outputs.setdefault(os.path.normcase(os.path.abspath(output_file)), input_file)
+        if other != input_file:
+            parser.error(f"{other} 和 {input_file} 的输出文件相同: {output_file}")
+        jobs_list.append((input_file, output_file))
+    for _, output_file in jobs_list:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+
+    if args.watch:
+        watch(jobs_list, mode=args.mode, locale=args.locale, interval=args.interval)
+        return 0
+
+    started = time.perf_counter()
+    results, failures = translate_many(jobs_list, mode=args.mode, jobs=args.jobs,
+                                       use_cache=not args.no_cache, locale=args.locale,
+                                       profile=profile, strip=args.strip, verify=args.verify,
+                                       cache_dir=args.cache_dir)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    if not args.no_cache and not args.strip:
+        prune_cache(args.cache_dir)
+
+    for input_file, exc in failures:
+        print(f"❌ {input_file}: {exc}", file=sys.stderr)
+    mismatched = [result for result in results if result['verify'] is not None]
+    for result in mismatched:
+        print(f"❌ {result['input']}: 校验失败，{result['verify']}", file=sys.stderr)
+
+    lines = sum(result['lines'] for result in results)
+    skipped = sum(1 for result in results if result['skipped'])
+    written = sum(1 for result in results if result['written'])
+    print(f"✅ 处理完成: {len(results)} 个文件（{skipped} 个未变化，写入 {written} 个），{lines} 行，"
+          f"失败 {len(failures)} 个，用时 {elapsed:.2f} 秒")
+    print(f"速度: {len(results) / elapsed:.1f} 文件/秒，{lines / elapsed:.0f} 行/秒")
+    if args.verify:
+        print(f"✅ 校验通过: {len(results) - len(mismatched)}/{len(results)} 个文件")
+
+    if profile is not None:
+        rules = get_rules(args.mode, args.locale)
+        if args.profile:
+            print(profile.report(rules, sort=args.profile_sort))
+        if args.profile_json:
+            with open(args.profile_json, 'w', encoding='utf-8') as f:
+                json.dump(profile.to_dict(rules, sort=args.profile_sort), f, ensure_ascii=False,
+                          indent=2)
+    return 1 if failures or mismatched else 0
+
 
 if __name__ == '__main__':
-    # 输入和输出文件路径
-    input_file = '/home/pps/code/web-check/web-check/public/resources/openapi-spec.yml'
-    output_file = '/home/pps/code/web-check/web-check/public/resources/openapi-spec.yml'
-    
-    # 执行翻译
-    translate_openapi_spec(input_file, output_file)
\ No newline at end of file
+    sys.exit(main())